@@ -0,0 +1,366 @@
+"""Load test for the scrub API: throughput, tail latency and error rates.
+
+Starts the app locally (``--server-workers`` uvicorn processes, throwaway storage)
+or drives an already running one with ``--url``. ``--concurrency`` clients loop over
+a weighted mix of operations on a deterministic synthetic corpus:
+
+    scrub      POST /images/scrub, stored; its output feeds the downloads
+    inline     POST /images/scrub?inline=true
+    download   GET /images/download/{name} of an earlier output
+
+    python benchmarks/bench_load.py                               # 20 s, 8 clients
+    python benchmarks/bench_load.py --ops scrub=1,download=3 --json run.json
+    python benchmarks/bench_load.py --url http://staging:8000 --concurrency 32
+    python benchmarks/bench_load.py --compare old.json --json new.json
+
+Requests issued during ``--warmup`` are not counted. Operations and image sizes are
+drawn from a fixed seed, so runs of different commits on one machine see the same
+traffic; ``--compare`` prints the change against an earlier ``--json`` report and
+exits 1 when RPS or p95 latency regress by more than ``--tolerance``.
+Needs httpx and Pillow (for the corpus).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, TextIO, Tuple
+
+HERE = Path(__file__).resolve().parent
+REPO = HERE.parents[2]
+CORPUS_DIR = HERE / ".corpus"
+PYTHONPATH = [
+    REPO / "packages" / "image_scrubber_core",
+    HERE.parent / "src",
+]
+
+# name -> (width, height)
+SIZES: Dict[str, Tuple[int, int]] = {
+    "small": (640, 480),
+    "medium": (2000, 1500),
+    "large": (4000, 3000),
+}
+OPS = ("scrub", "inline", "download")
+
+
+def _parse_weights(value: str, choices: Tuple[str, ...] | Dict[str, Any]) -> Dict[str, float]:
+    weights: Dict[str, float] = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in choices:
+            raise argparse.ArgumentTypeError(f"unknown {name!r}, expected one of {list(choices)}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def build_corpus() -> Dict[str, bytes]:
+    """One JPEG with EXIF per size, identical on every run."""
+    import piexif
+    from PIL import Image
+
+    CORPUS_DIR.mkdir(exist_ok=True)
+    corpus: Dict[str, bytes] = {}
+    for name, (width, height) in SIZES.items():
+        path = CORPUS_DIR / f"{name}.jpg"
+        if not path.exists():
+            rng = random.Random(name)
+            small = (max(1, width // 32), max(1, height // 32))
+            img = Image.frombytes("RGB", small, rng.randbytes(small[0] * small[1] * 3))
+            img = img.resize((width, height), Image.Resampling.BICUBIC)
+            exif = piexif.dump({"0th": {piexif.ImageIFD.Make: b"Bench"}, "GPS": {}})
+            buffer = io.BytesIO()
+            img.save(buffer, "JPEG", quality=90, exif=exif)
+            path.write_bytes(buffer.getvalue())
+        corpus[name] = path.read_bytes()
+    return corpus
+
+
+@dataclass
+class Sample:
+    op: str
+    size: str
+    seconds: float
+    status: int  # 0 when the request failed without a response
+
+
+@dataclass
+class OpStats:
+    requests: int
+    rps: float
+    errors: int
+    error_rate: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+
+def summarize(samples: List[Sample], seconds: float) -> OpStats:
+    latencies = sorted(s.seconds * 1000 for s in samples)
+    errors = sum(1 for s in samples if not 200 <= s.status < 400)
+    if len(latencies) >= 2:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+        p50, p95, p99 = cuts[49], cuts[94], cuts[98]
+    else:
+        p50 = p95 = p99 = latencies[0] if latencies else 0.0
+    return OpStats(
+        requests=len(samples),
+        rps=len(samples) / seconds if seconds else 0.0,
+        errors=errors,
+        error_rate=errors / len(samples) if samples else 0.0,
+        p50_ms=p50,
+        p95_ms=p95,
+        p99_ms=p99,
+        max_ms=latencies[-1] if latencies else 0.0,
+        statuses=dict(sorted(Counter(str(s.status) for s in samples).items())),
+    )
+
+
+class LoadRun:
+    def __init__(self, base_url: str, corpus: Dict[str, bytes], args: argparse.Namespace):
+        self.base_url = base_url.rstrip("/")
+        self.corpus = corpus
+        self.args = args
+        self.outputs: List[str] = []
+        self.samples: List[Sample] = []
+
+    async def _request(self, client: Any, op: str, size: str, rng: random.Random) -> int:
+        if op == "download":
+            name = rng.choice(self.outputs)
+            response = await client.get(f"/images/download/{name}")
+            return int(response.status_code)
+
+        files = {"file": (f"{size}.jpg", self.corpus[size], "image/jpeg")}
+        params = {"inline": "true"} if op == "inline" else None
+        response = await client.post("/images/scrub", files=files, params=params)
+        if op == "scrub" and response.status_code == 200:
+            self.outputs.append(response.json()["output_filename"])
+        return int(response.status_code)
+
+    async def _client(self, client: Any, index: int, start: float, deadline: float) -> None:
+        rng = random.Random(self.args.seed * 1000 + index)
+        ops, op_weights = zip(*self.args.ops.items())
+        sizes, size_weights = zip(*self.args.sizes.items())
+        while time.perf_counter() < deadline:
+            op = rng.choices(ops, op_weights)[0]
+            size = rng.choices(sizes, size_weights)[0]
+            if op == "download" and not self.outputs:
+                op = "scrub"
+            t0 = time.perf_counter()
+            try:
+                status = await self._request(client, op, size, rng)
+            except Exception:
+                status = 0
+            if t0 >= start:
+                self.samples.append(Sample(op, size, time.perf_counter() - t0, status))
+
+    async def run(self) -> float:
+        """Drive the load; return the measured (post-warmup) wall time."""
+        import httpx
+
+        limits = httpx.Limits(max_connections=self.args.concurrency)
+        async with httpx.AsyncClient(
+            base_url=self.base_url, limits=limits, timeout=self.args.timeout
+        ) as client:
+            # One stored output per size, so downloads have something to fetch
+            for size in self.args.sizes:
+                await self._request(client, "scrub", size, random.Random())
+            start: float = time.perf_counter() + self.args.warmup
+            deadline: float = start + self.args.duration
+            await asyncio.gather(
+                *(self._client(client, i, start, deadline) for i in range(self.args.concurrency))
+            )
+            # The last requests may finish after the deadline
+            return max(time.perf_counter(), deadline) - start
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return int(sock.getsockname()[1])
+
+
+def start_server(workers: int, workdir: Path) -> Tuple[subprocess.Popen[bytes], str]:
+    """Run the app with production settings on a free port and throwaway storage."""
+    import httpx
+
+    port = _free_port()
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [str(p) for p in PYTHONPATH] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else [])
+    )
+    env.update(
+        IMAGE_SCRUBBER_HOST="127.0.0.1",
+        IMAGE_SCRUBBER_PORT=str(port),
+        IMAGE_SCRUBBER_WORKERS=str(workers),
+        IMAGE_SCRUBBER_STORAGE_DIR=str(workdir / "storage"),
+        IMAGE_SCRUBBER_JOBS_DIR=str(workdir / "jobs"),
+    )
+    log = open(workdir / "server.log", "wb")
+    server = subprocess.Popen(
+        [sys.executable, "-c", "from image_scrubber_api.main import run; run()"],
+        env=env,
+        stdout=log,
+        stderr=subprocess.STDOUT,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited early, see {workdir / 'server.log'}")
+        try:
+            httpx.get(f"{url}/metrics", timeout=1)
+            return server, url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("Server did not start within 60 s")
+
+
+def _git_commit() -> str | None:
+    out = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], cwd=REPO, capture_output=True, text=True
+    )
+    return out.stdout.strip() or None
+
+
+def compare(
+    report: Dict[str, Any], previous: Dict[str, Any], tolerance: float, out: TextIO
+) -> List[str]:
+    regressions = []
+    print(f"\n{'vs ' + str(previous.get('commit')):24} {'RPS':>16} {'p95 ms':>18}", file=out)
+    for op, stats in report["results"].items():
+        old = previous["results"].get(op)
+        if old is None:
+            continue
+        rps_delta = stats["rps"] / old["rps"] - 1 if old["rps"] else 0.0
+        p95_delta = stats["p95_ms"] / old["p95_ms"] - 1 if old["p95_ms"] else 0.0
+        print(
+            f"{op:24} {old['rps']:7.1f} {rps_delta:+8.1%} {old['p95_ms']:8.1f} {p95_delta:+9.1%}",
+            file=out,
+        )
+        if rps_delta < -tolerance:
+            regressions.append(f"{op}: {stats['rps']:.1f} RPS vs {old['rps']:.1f}")
+        if p95_delta > tolerance:
+            regressions.append(f"{op}: p95 {stats['p95_ms']:.1f} ms vs {old['p95_ms']:.1f} ms")
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target a running server instead of starting one")
+    parser.add_argument("--server-workers", type=int, default=1, help="local server processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="uncounted seconds first")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per request seconds")
+    parser.add_argument(
+        "--ops",
+        type=lambda v: _parse_weights(v, OPS),
+        default="scrub=2,inline=1,download=2",
+        help="weighted operation mix (scrub=2,inline=1,download=2)",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda v: _parse_weights(v, SIZES),
+        default="small=6,medium=3,large=1",
+        help="weighted image size mix (small=6,medium=3,large=1)",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="write the report here ('-' = stdout only)")
+    parser.add_argument("--compare", type=Path, help="earlier --json report to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed regression")
+    args = parser.parse_args(argv)
+
+    try:
+        import httpx  # noqa: F401
+    except ImportError:
+        print("bench_load needs httpx: pip install httpx", file=sys.stderr)
+        return 2
+
+    corpus = build_corpus()
+    out = sys.stderr if args.json == Path("-") else sys.stdout
+
+    with tempfile.TemporaryDirectory(prefix="bench-load-") as tmp:
+        server = None
+        url = args.url
+        if url is None:
+            server, url = start_server(args.server_workers, Path(tmp))
+        try:
+            run = LoadRun(url, corpus, args)
+            seconds = asyncio.run(run.run())
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait(timeout=60)
+
+    by_op: Dict[str, List[Sample]] = {}
+    for sample in run.samples:
+        by_op.setdefault(sample.op, []).append(sample)
+    results = {"all": summarize(run.samples, seconds)}
+    results.update({op: summarize(by_op[op], seconds) for op in OPS if op in by_op})
+
+    print(
+        f"{'op':24} {'requests':>9} {'RPS':>8} {'errors':>7} "
+        f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}",
+        file=out,
+    )
+    for op, stats in results.items():
+        print(
+            f"{op:24} {stats.requests:9d} {stats.rps:8.1f} {stats.error_rate:7.1%} "
+            f"{stats.p50_ms:8.1f} {stats.p95_ms:8.1f} {stats.p99_ms:8.1f}",
+            file=out,
+        )
+
+    report = {
+        "commit": _git_commit(),
+        "machine": {
+            "platform": platform.platform(),
+            "python": sys.version.split()[0],
+            "cpus": os.cpu_count(),
+        },
+        "config": {
+            "url": args.url,
+            "server_workers": None if args.url else args.server_workers,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "warmup": args.warmup,
+            "ops": args.ops,
+            "sizes": args.sizes,
+            "seed": args.seed,
+        },
+        "seconds": seconds,
+        "results": {op: asdict(stats) for op, stats in results.items()},
+    }
+    if args.json == Path("-"):
+        print(json.dumps(report, indent=2))
+    elif args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+    if args.compare:
+        regressions = compare(report, json.loads(args.compare.read_text()), args.tolerance, out)
+        if regressions:
+            print("\nRegressions:", file=out)
+            for line in regressions:
+                print(f"  {line}", file=out)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
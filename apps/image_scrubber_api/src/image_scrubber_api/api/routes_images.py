@@ -1,67 +1,564 @@
 from __future__ import annotations
 
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import zipfile
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Annotated
+from typing import IO, Any, AsyncIterator, Callable, Dict, List, Set, cast
 
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Form
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from PIL import UnidentifiedImageError
+from starlette.types import Receive, Scope, Send
 
-from image_scrubber_core.metadata.cleaner import MetadataCleaner
-from image_scrubber_core.metadata.writer import MetadataWriter
-from image_scrubber_core.filenames.sanitizer import FilenameSanitizer
-from image_scrubber_core.security.hashing import FileHasher
+from image_scrubber_core.cache.result_cache import ScrubCache
+from image_scrubber_core.exceptions import MemoryBudgetExceeded
+from image_scrubber_core.metadata.scrubber import ImageScrubber, ScrubOptions
+from image_scrubber_core.filenames.sanitizer import FilenameAllocator, FilenameSanitizer
 from image_scrubber_api.core.config import settings
+from image_scrubber_api.core.storage import OutputStore
+from image_scrubber_api.core.uploads import StreamedUpload, receive_upload, receive_uploads
+from image_scrubber_api.core.workers import (
+    ArchiveMember,
+    ScrubExecutor,
+    ScrubSource,
+    WorkerPoolSaturated,
+)
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/images", tags=["images"])
 
+SUPPORTED_SUFFIXES = {".jpg", ".jpeg", ".png", ".bmp", ".tiff", ".tif", ".webp"}
+ARCHIVE_SUFFIXES = {".zip"}
+
+# Pillow reports corrupt pixel data as an OSError starting with one of these (the
+# lossless JPEG path raises ValueError instead)
+_DECODER_ERRORS = ("image file is truncated", "broken data stream", "decoder error")
+
+cache = (
+    ScrubCache(
+        settings.cache_dir,
+        max_bytes=settings.cache_max_bytes,
+        max_age=settings.cache_max_age_seconds,
+    )
+    if settings.cache_dir
+    else None
+)
+
+storage = OutputStore(
+    settings.storage_dir,
+    max_bytes=settings.storage_max_bytes,
+    ttl=settings.storage_ttl_seconds,
+    index_path=settings.storage_index,
+)
+
+
+def name_allocator() -> FilenameAllocator:
+    """Allocator for the outputs of one request.
+
+    Uploads that sanitize to the same name get name-2.jpg, name-3.jpg... instead of
+    overwriting each other. Uniqueness comes from the reservations in the storage
+    index, which hold across requests and API processes (and are dropped by the
+    sweep), so an allocator only lives as long as its request: a process-wide one
+    would remember every name ever handed out.
+    """
+    return FilenameAllocator(claim=storage.reserve)
+
+
+# Several API processes split the CPUs between their pools instead of each one
+# starting a worker per CPU
+executor = ScrubExecutor(
+    settings.scrub_workers or max(1, (os.cpu_count() or 1) // settings.workers),
+    settings.scrub_queue_size,
+    prewarm=settings.prewarm,
+)
+
+options = ScrubOptions(
+    profile=settings.encoder_profile,
+    output_format=settings.output_format or None,
+    max_dimension=settings.max_dimension,
+    memory_budget=settings.memory_budget,
+    downscale_to_budget=settings.downscale_to_budget,
+)
+
 
-@router.post("/scrub", response_model=dict)
+# The body is parsed by receive_upload, so the form is described here for the docs
+UPLOAD_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {
+                        "file": {
+                            "type": "string",
+                            "format": "binary",
+                            "description": "Imagen a limpiar",
+                        },
+                        "seo_name": {"type": "string", "description": "Nombre SEO opcional"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+_BATCH_FORM = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["files"],
+                    "properties": {
+                        "files": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                            "description": "Imágenes a limpiar, sueltas o dentro de archivos ZIP",
+                        },
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+def service_busy() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor ocupado, inténtalo de nuevo más tarde",
+        headers={"Retry-After": str(settings.retry_after_seconds)},
+    )
+
+
+@router.post(
+    "/scrub",
+    response_model=dict,
+    openapi_extra=UPLOAD_FORM,
+    responses={
+        200: {
+            "content": {"image/*": {}},
+            "description": "Con inline=true: la imagen limpia, con su sha256 en las cabeceras",
+        }
+    },
+)
 async def scrub_image(
-    file: Annotated[UploadFile, File(..., description="Imagen a limpiar")],
-    seo_name: Annotated[str | None, Form(None, description="Nombre SEO opcional")] = None,
-) -> dict:
-    if not file.filename:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Filename missing")
-
-    original_suffix = Path(file.filename).suffix.lower()
-    if original_suffix not in {".jpg", ".jpeg", ".png", ".bmp", ".tiff"}:
+    request: Request,
+    inline: bool = Query(False, description="Devolver la imagen en vez de guardarla"),
+) -> Any:
+    """Scrub one image into storage and describe the result.
+
+    With ``inline=true`` the scrubbed image is the response body instead and nothing
+    is stored; ``X-Image-Sha256``, ``X-Image-Had-Metadata`` and ``X-Input-Sha256``
+    carry what the JSON would have said.
+    """
+    # The slot is taken before reading the body: when the pool is saturated the
+    # client is told to back off before it uploads anything
+    try:
+        async with executor.slot():
+            return await _scrub_upload(request, inline)
+    except WorkerPoolSaturated:
+        raise service_busy() from None
+
+
+async def _scrub_upload(request: Request, inline: bool = False) -> Any:
+    # Streamed into a spool and hashed on the way in; oversized uploads are cut off
+    # with 413 without ever being held in memory
+    upload = await receive_upload(
+        request,
+        "file",
+        max_bytes=settings.max_upload_bytes,
+        spool_bytes=settings.upload_spool_bytes,
+        allowed_suffixes=SUPPORTED_SUFFIXES,
+        spool_dir=settings.upload_spool_dir,
+    )
+    try:
+        proposed = upload.fields.get("seo_name") or Path(upload.filename).stem
+        if inline:
+            return await _scrub_inline(upload, proposed)
+        return await scrub_source(upload.source, proposed, upload.sha256)
+    except MemoryBudgetExceeded as exc:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Imagen demasiado grande para el presupuesto de memoria: {exc}",
+        ) from exc
+    except UnidentifiedImageError as exc:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="El archivo no es una imagen en un formato soportado",
+        ) from exc
+    except (ValueError, OSError) as exc:
+        if isinstance(exc, OSError) and not str(exc).startswith(_DECODER_ERRORS):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="La imagen está dañada o incompleta"
+        ) from exc
+    finally:
+        upload.close()
+
+
+async def _scrub_inline(upload: StreamedUpload, proposed: str) -> Response:
+    # The worker hands the output back instead of writing it: no storage write, no
+    # index entry and no second request to download it. Everything is known before
+    # the first byte is sent, so plain headers do the job of trailers.
+    extension = await run_in_threadpool(_extension, upload.source)
+    filename = FilenameSanitizer.sanitize(proposed, extension)
+    had_meta, sha, data = await executor.scrub_bytes(
+        upload.source, options, cache=cache, input_sha256=upload.sha256
+    )
+    return Response(
+        data,
+        media_type=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+        headers={
+            "ETag": f'"{sha}"',
+            "Content-Disposition": f'inline; filename="{filename}"',
+            "X-Image-Sha256": sha,
+            "X-Image-Had-Metadata": "true" if had_meta else "false",
+            "X-Input-Sha256": upload.sha256,
+        },
+    )
+
+
+def _extension(source: ScrubSource) -> str:
+    """Output extension for ``source``; sniffs its header, so not for the event loop."""
+    if isinstance(source, ArchiveMember):
+        # Only the first bytes are read to detect the format
+        with source.open() as fp:
+            extension: str = ImageScrubber.extension_for(fp, options)
+    else:
+        extension = ImageScrubber.extension_for(source, options)
+    return extension
+
+
+async def scrub_source(
+    source: ScrubSource,
+    proposed: str,
+    input_sha256: str | None = None,
+    names: FilenameAllocator | None = None,
+) -> Dict[str, Any]:
+    """Scrub ``source`` into storage under a free name derived from ``proposed``.
+
+    The items of a batch share ``names``; a single upload gets its own allocator.
+    """
+    names = names or name_allocator()
+    extension = await run_in_threadpool(_extension, source)
+    sanitized = await run_in_threadpool(names.allocate, proposed, extension)
+    try:
+        # Decode and encode run in the process pool, off the event loop
+        had_meta, sha, input_sha256 = await executor.scrub(
+            source, storage.path_for(sanitized), options, cache=cache, input_sha256=input_sha256
+        )
+        await run_in_threadpool(storage.commit, sanitized, sha)
+    except BaseException:
+        # Cancelled included: the executor only returns once the worker stopped
+        # writing, so nothing reappears after the discard
+        names.release(sanitized)
+        await asyncio.shield(run_in_threadpool(discard_output, sanitized))
+        raise
+    return {
+        "output_filename": sanitized,
+        "had_metadata": had_meta,
+        "sha256": sha,
+        "input_sha256": input_sha256,
+        # Content-addressed URL, cacheable forever
+        "download_url": f"{router.prefix}/download/{sha}/{sanitized}",
+    }
+
+
+def public_error(exc: BaseException) -> str:
+    """Error shown to clients: the exception type and a fixed description.
+
+    The exception text stays in the server log; it names spool and storage paths
+    and the reprs of in-memory buffers.
+    """
+    if isinstance(exc, MemoryBudgetExceeded):
+        detail = "la imagen no cabe en el presupuesto de memoria"
+    elif isinstance(exc, UnidentifiedImageError):
+        detail = "el archivo no es una imagen válida"
+    elif isinstance(exc, ValueError) or (
+        isinstance(exc, OSError) and str(exc).startswith(_DECODER_ERRORS)
+    ):
+        detail = "la imagen está dañada o incompleta"
+    else:
+        detail = "error interno al procesar la imagen"
+    return f"{type(exc).__name__}: {detail}"
+
+
+def discard_output(name: str) -> None:
+    """Delete an output that must not be published after all."""
+    storage.discard(name)
+
+
+@dataclass
+class _BatchItem:
+    source_name: str
+    source: ScrubSource | None = None
+    input_sha256: str | None = None
+    # Set for entries rejected before scrubbing (oversized ZIP member...)
+    error: str | None = None
+
+
+def _batch_items(uploads: List[StreamedUpload]) -> List[_BatchItem]:
+    """Flatten loose images and the images inside ZIP uploads into one list."""
+    items: List[_BatchItem] = []
+    for upload in uploads:
+        if Path(upload.filename).suffix.lower() not in ARCHIVE_SUFFIXES:
+            items.append(_BatchItem(upload.filename, upload.source, upload.sha256))
+            continue
+        try:
+            with zipfile.ZipFile(upload.path) as archive:  # type: ignore[arg-type]
+                members = archive.infolist()
+        except zipfile.BadZipFile:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"ZIP no válido: {upload.filename}",
+            ) from None
+        for member in members:
+            if member.is_dir() or Path(member.filename).suffix.lower() not in SUPPORTED_SUFFIXES:
+                continue
+            item = _BatchItem(
+                f"{upload.filename}/{member.filename}",
+                ArchiveMember(upload.path, member.filename),  # type: ignore[arg-type]
+            )
+            # file_size is what the worker will inflate; ZipFile stops reading there
+            if member.file_size > settings.max_upload_bytes:
+                item.source = None
+                limit_mib = settings.max_upload_bytes // 2**20
+                item.error = f"La imagen supera el tamaño máximo de {limit_mib} MiB"
+            items.append(item)
+
+    if len(items) > settings.batch_max_files:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Formato no soportado",
+            detail=f"Demasiados archivos (máximo {settings.batch_max_files})",
         )
+    return items
 
-    tmp_input = settings.storage_dir / f"upload_{file.filename}"
-    with tmp_input.open("wb") as f:
-        content = await file.read()
-        f.write(content)
 
+async def _scrub_item(item: _BatchItem, names: FilenameAllocator) -> Dict[str, Any]:
+    record: Dict[str, Any] = {"source": item.source_name}
+    if item.source is None:
+        record["error"] = item.error
+        return record
     try:
-        cleaner = MetadataCleaner()
-        img, had_meta = cleaner.clean(tmp_input)
+        proposed = Path(item.source_name).stem
+        record.update(await scrub_source(item.source, proposed, item.input_sha256, names))
+    except Exception as exc:
+        # One bad image must not abort the rest of the batch
+        logger.exception("Batch item %s failed", item.source_name)
+        record["error"] = public_error(exc)
+    return record
+
+
+async def _scrub_all(items: List[_BatchItem]) -> AsyncIterator[Dict[str, Any]]:
+    """Yield one record per item, in completion order.
+
+    At most one job per worker is in flight for the request, so a large batch does
+    not flood the pool queue ahead of other clients.
+    """
+    pending = iter(items)
+    names = name_allocator()
+    running: Set[asyncio.Future[Dict[str, Any]]] = set()
+    try:
+        while True:
+            while len(running) < executor.max_workers:
+                item = next(pending, None)
+                if item is None:
+                    break
+                running.add(asyncio.ensure_future(_scrub_item(item, names)))
+            if not running:
+                return
+            done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        # Client went away: cancel the jobs still in flight and wait for them, so
+        # each one discards the name it reserved and any file it wrote
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+
+
+async def _ndjson(records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    async for record in records:
+        yield (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+class _ZipSink:
+    """Write-only stream for ZipFile; written bytes are kept until drained.
+
+    Having no ``tell``, it makes ZipFile write data descriptors instead of seeking
+    back, so the archive can be sent while it is being built.
+    """
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _zip(records: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Stream a ZIP of the scrubbed images, plus a manifest.ndjson of every record.
+
+    Images are stored without recompression (they are compressed already) and only
+    the one being added is held in memory.
+    """
+    sink = _ZipSink()
+    # Only write() and flush() are used, which is all ZipFile needs from a stream
+    archive = zipfile.ZipFile(cast(IO[bytes], sink), "w", compression=zipfile.ZIP_STORED)
+    manifest: List[str] = []
+    async for record in records:
+        manifest.append(json.dumps(record, ensure_ascii=False) + "\n")
+        if "output_filename" in record:
+            name = record["output_filename"]
+            await run_in_threadpool(archive.write, storage.path_for(name), name)
+            yield sink.drain()
+    archive.writestr("manifest.ndjson", "".join(manifest))
+    archive.close()
+    yield sink.drain()
 
-        proposed = seo_name or Path(file.filename).stem
-        sanitized = FilenameSanitizer.sanitize(proposed)
-        output_path = settings.storage_dir / sanitized
 
-        MetadataWriter.add_generic_and_save(img, output_path)
+class _ReleasingResponse(StreamingResponse):
+    """StreamingResponse that runs ``on_close`` once it is done, however it ends.
 
-        sha = FileHasher.sha256(output_path)
+    A ``finally`` in the body generator is not enough: when the client disconnects
+    before the first chunk the generator never starts and its cleanup never runs.
+    """
 
-        return {
-            "output_filename": sanitized,
-            "had_metadata": had_meta,
-            "sha256": sha,
+    def __init__(
+        self, content: AsyncIterator[bytes], on_close: Callable[[], None], **kwargs: Any
+    ) -> None:
+        super().__init__(content, **kwargs)
+        self.on_close = on_close
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.on_close()
+
+
+@router.post(
+    "/scrub/batch",
+    openapi_extra=_BATCH_FORM,
+    response_class=StreamingResponse,
+    responses={
+        200: {
+            "content": {"application/x-ndjson": {}, "application/zip": {}},
+            "description": "Un registro NDJSON por imagen, o un ZIP con las imágenes limpias",
         }
+    },
+)
+async def scrub_batch(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|zip)$"),
+) -> StreamingResponse:
+    """Scrub many images in parallel and stream the results as they complete.
 
-    finally:
-        if tmp_input.exists():
-            tmp_input.unlink(missing_ok=True)
+    ``files`` takes loose images and ZIP archives of images. With ``format=ndjson``
+    each line is the record of one image (``output_filename``, ``had_metadata``,
+    ``sha256``... or ``error``); with ``format=zip`` the scrubbed images themselves
+    are streamed, with those records in ``manifest.ndjson`` at the end.
+    """
+    # Like /scrub, the whole batch takes a single slot, before its body is read
+    try:
+        executor.acquire()
+    except WorkerPoolSaturated:
+        raise service_busy() from None
+
+    uploads: List[StreamedUpload] = []
 
+    def close() -> None:
+        executor.release()
+        for upload in uploads:
+            upload.close()
+
+    try:
+        uploads = await receive_uploads(
+            request,
+            "files",
+            max_bytes=settings.max_upload_bytes,
+            spool_bytes=settings.upload_spool_bytes,
+            allowed_suffixes=SUPPORTED_SUFFIXES | ARCHIVE_SUFFIXES,
+            spool_dir=settings.upload_spool_dir,
+            max_files=settings.batch_max_files,
+            max_total_bytes=settings.batch_max_bytes,
+            # Workers open archives by path, one member at a time
+            spill_suffixes=ARCHIVE_SUFFIXES,
+        )
+        items = await run_in_threadpool(_batch_items, uploads)
+    except BaseException:
+        close()
+        raise
+
+    if format == "zip":
+        return _ReleasingResponse(
+            _zip(_scrub_all(items)),
+            close,
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="imagenes.zip"'},
+        )
+    return _ReleasingResponse(_ndjson(_scrub_all(items)), close, media_type="application/x-ndjson")
 
-@router.get("/download/{filename}")
-async def download_image(filename: str):
-    path = settings.storage_dir / filename
-    if not path.is_file():
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as RFC 9110 prescribes for If-None-Match
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+async def _serve(
+    request: Request, filename: str, cache_control: str, sha256: str | None = None
+) -> Response:
+    found = await run_in_threadpool(storage.get, filename)
+    if found is None or (sha256 is not None and found[1] != sha256):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
 
-    return FileResponse(path, filename=filename, media_type="image/jpeg")
\ No newline at end of file
+    path, sha = found
+    headers = {"ETag": f'"{sha}"', "Cache-Control": cache_control}
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    # FileResponse answers Range and If-Range requests (206/416) against this ETag
+    media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    return FileResponse(path, filename=filename, media_type=media_type, headers=headers)
+
+
+@router.api_route("/download/{filename}", methods=["GET", "HEAD"])
+async def download_image(request: Request, filename: str) -> Response:
+    """Serve an output; clients revalidate it with its ETag (the output sha256)."""
+    return await _serve(request, filename, "no-cache")
+
+
+@router.api_route("/download/{sha256}/{filename}", methods=["GET", "HEAD"])
+async def download_image_version(request: Request, sha256: str, filename: str) -> Response:
+    """Serve an output only if its content is still ``sha256``, cacheable forever."""
+    return await _serve(request, filename, IMMUTABLE, sha256=sha256.lower())
@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict
+
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from PIL import UnidentifiedImageError
+
+from image_scrubber_core.exceptions import MemoryBudgetExceeded
+from image_scrubber_api.api.routes_images import (
+    SUPPORTED_SUFFIXES,
+    UPLOAD_FORM,
+    discard_output,
+    executor,
+    public_error,
+    scrub_source,
+    service_busy,
+)
+from image_scrubber_api.core.config import settings
+from image_scrubber_api.core.jobs import DONE, FAILED, Job, JobStore
+from image_scrubber_api.core.uploads import receive_upload
+from image_scrubber_api.core.workers import WorkerPoolSaturated
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/images/jobs", tags=["jobs"])
+
+store = JobStore(
+    settings.jobs_dir, max_attempts=settings.jobs_max_attempts, ttl=settings.jobs_ttl_seconds
+)
+
+
+class JobRunner:
+    """Drains the job store into the scrub process pool.
+
+    Jobs are claimed only while the pool has a free slot, and at most ``max_running``
+    at a time, so queued jobs use capacity left over by /scrub requests instead of
+    pushing them into 503s.
+    """
+
+    def __init__(
+        self,
+        store: JobStore,
+        max_running: int = 1,
+        poll_seconds: float = 1.0,
+        lease_seconds: float = 300,
+    ):
+        self.store = store
+        self.max_running = max_running
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._running: Dict[str, asyncio.Task[None]] = {}
+        self._wake = asyncio.Event()
+        self._last_expire = 0.0
+
+    def wake(self) -> None:
+        """Look for work now instead of at the next poll."""
+        self._wake.set()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self._tick()
+            except Exception:
+                logger.exception("Job runner tick failed")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _tick(self) -> None:
+        if self._running:
+            await run_in_threadpool(self.store.renew, list(self._running), self.lease_seconds)
+        if time.time() - self._last_expire > 60:
+            self._last_expire = time.time()
+            await run_in_threadpool(self.store.expire)
+
+        while len(self._running) < self.max_running:
+            try:
+                executor.acquire()
+            except WorkerPoolSaturated:
+                return
+            try:
+                job = await run_in_threadpool(self.store.claim, self.lease_seconds)
+            except BaseException:
+                executor.release()
+                raise
+            if job is None:
+                executor.release()
+                return
+            self._running[job.id] = asyncio.create_task(self._process(job))
+
+    async def _process(self, job: Job) -> None:
+        try:
+            result = await scrub_source(
+                self.store.input_path(job.id), job.proposed, job.input_sha256
+            )
+        except (MemoryBudgetExceeded, UnidentifiedImageError) as exc:
+            # Retrying cannot make the image fit or decodable
+            logger.info("Job %s failed: %s", job.id, exc)
+            await run_in_threadpool(self.store.fail, job.id, public_error(exc))
+        except Exception as exc:
+            backoff = settings.jobs_retry_backoff_seconds * 2 ** (job.attempts - 1)
+            state = await run_in_threadpool(self.store.fail, job.id, public_error(exc), backoff)
+            logger.warning(
+                "Job %s attempt %d failed (%s)", job.id, job.attempts, state, exc_info=exc
+            )
+        else:
+            if not await run_in_threadpool(self.store.complete, job.id, result):
+                # Cancelled while it ran: drop the output it produced
+                await run_in_threadpool(discard_output, result["output_filename"])
+        finally:
+            executor.release()
+            self._running.pop(job.id, None)
+            self.wake()
+
+    async def stop(self, timeout: float = 0) -> None:
+        """Let the jobs in flight finish for up to ``timeout`` seconds.
+
+        Call it once ``run`` is cancelled. Jobs still running after that are
+        interrupted and put back in the queue for the next start.
+        """
+        if self._running and timeout > 0:
+            await asyncio.wait(list(self._running.values()), timeout=timeout)
+        interrupted = list(self._running)
+        for task in self._running.values():
+            task.cancel()
+        await asyncio.gather(*self._running.values(), return_exceptions=True)
+        await run_in_threadpool(self.store.requeue, interrupted)
+
+
+def _max_running() -> int:
+    limit = settings.jobs_max_running or executor.max_workers // 2
+    return max(1, min(limit, executor.max_workers - 1))
+
+
+runner = JobRunner(
+    store,
+    max_running=_max_running(),
+    poll_seconds=settings.jobs_poll_seconds,
+    lease_seconds=settings.jobs_lease_seconds,
+)
+
+
+def _timestamp(value: float) -> str:
+    return datetime.fromtimestamp(value, timezone.utc).isoformat()
+
+
+def _describe(job: Job) -> Dict[str, Any]:
+    return {
+        "job_id": job.id,
+        "status": job.state,
+        "filename": job.filename,
+        "attempts": job.attempts,
+        "result": job.result,
+        "error": job.error,
+        "created": _timestamp(job.created),
+        "updated": _timestamp(job.updated),
+    }
+
+
+async def _get_job(job_id: str) -> Job:
+    job = await run_in_threadpool(store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return job
+
+
+@router.post(
+    "", status_code=status.HTTP_202_ACCEPTED, response_model=dict, openapi_extra=UPLOAD_FORM
+)
+async def create_job(request: Request, response: Response) -> Dict[str, Any]:
+    """Queue an image for scrubbing and return at once with the job id.
+
+    The upload is kept on disk until the job finishes, so queued jobs survive a
+    restart; poll ``GET /images/jobs/{job_id}`` for the result.
+    """
+    # Refused before the body is read, like /scrub when the pool is saturated
+    if await run_in_threadpool(store.queued) >= settings.jobs_max_queued:
+        raise service_busy()
+
+    upload = await receive_upload(
+        request,
+        "file",
+        max_bytes=settings.max_upload_bytes,
+        spool_bytes=0,
+        allowed_suffixes=SUPPORTED_SUFFIXES,
+        spool_dir=store.inputs,
+    )
+    job_id = store.new_id()
+    target = store.input_path(job_id)
+    try:
+        if upload.path is not None:
+            os.replace(upload.path, target)
+        else:
+            target.write_bytes(upload.data or b"")
+        proposed = upload.fields.get("seo_name") or Path(upload.filename).stem
+        job = await run_in_threadpool(
+            store.create, job_id, upload.filename, proposed, upload.sha256
+        )
+    except BaseException:
+        upload.close()
+        target.unlink(missing_ok=True)
+        raise
+
+    runner.wake()
+    response.headers["Location"] = f"{router.prefix}/{job.id}"
+    return _describe(job)
+
+
+@router.get("/{job_id}", response_model=dict)
+async def get_job(job_id: str) -> Dict[str, Any]:
+    return _describe(await _get_job(job_id))
+
+
+@router.delete("/{job_id}", response_model=dict)
+async def cancel_job(job_id: str) -> Dict[str, Any]:
+    """Cancel a queued or running job; 409 when it has already finished."""
+    job = await _get_job(job_id)
+    if job.state in (DONE, FAILED):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=f"El trabajo ya terminó ({job.state})"
+        )
+    cancelled = await run_in_threadpool(store.cancel, job_id)
+    if cancelled is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Job not found")
+    return _describe(cancelled)
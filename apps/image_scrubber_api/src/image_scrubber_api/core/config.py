@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+import os
 from pathlib import Path
+from typing import Any, get_args
 
 from pydantic import BaseModel
 
@@ -8,11 +10,106 @@ from pydantic import BaseModel
 class Settings(BaseModel):
     api_name: str = "image-scrubber-api"
     api_version: str = "0.1.0"
+
+    # Serving (image-scrubber-api / main.run). Each of the `workers` processes runs
+    # the whole app; on SIGTERM they stop accepting connections and give in-flight
+    # requests graceful_shutdown_seconds to finish. Past limit_concurrency open
+    # connections per process new ones get 503; a process is recycled after
+    # max_requests requests. reload is for development only (implies one process)
+    host: str = "0.0.0.0"
+    port: int = 8000
+    workers: int = 1
+    reload: bool = False
+    keep_alive_seconds: int = 5
+    limit_concurrency: int | None = None
+    backlog: int = 2048
+    max_requests: int | None = None
+    graceful_shutdown_seconds: int = 30
+    # Import Pillow and its format plugins, and start the scrub processes, before
+    # the first request instead of during it
+    prewarm: bool = True
     storage_dir: Path = Path("/tmp/image_scrubber_api_storage").resolve()
+    # Outputs are sharded in subdirectories of storage_dir and indexed (sha256 for the
+    # download ETag, size, last access) in storage_index, storage_dir/.index.sqlite3 if
+    # unset. Every storage_sweep_seconds, files unused for storage_ttl_seconds are
+    # deleted, then the least recently used until the total fits in storage_max_bytes
+    # (None disables either limit)
+    storage_index: Path | None = None
+    storage_max_bytes: int | None = 10 << 30
+    storage_ttl_seconds: float | None = 30 * 24 * 3600
+    storage_sweep_seconds: float = 300
+
+    # Encoder profile (fast, balanced, smallest) and output format (JPEG, PNG, WEBP,
+    # TIFF); an empty output format keeps the format of each upload
+    encoder_profile: str = "balanced"
+    output_format: str = "JPEG"
+    # Longest side of published images; larger uploads are decoded at reduced size
+    max_dimension: int | None = None
+    # Peak bytes one decode may use (None = unbounded); uploads that cannot fit are
+    # rejected with 413, or shrunk until they fit when downscale_to_budget is set
+    memory_budget: int | None = None
+    downscale_to_budget: bool = False
+
+    # Uploads are streamed: kept in memory up to upload_spool_bytes, spilled to a
+    # temporary file beyond it, and rejected with 413 past max_upload_bytes
+    max_upload_bytes: int = 100 * 2**20
+    upload_spool_bytes: int = 8 * 2**20
+    upload_spool_dir: Path | None = None
+    # /images/scrub/batch: at most batch_max_files images (loose or inside ZIPs) and
+    # batch_max_bytes uploaded per request; each file is still capped by the above
+    batch_max_files: int = 100
+    batch_max_bytes: int = 1 << 30
+
+    # Scrubbing runs in a process pool of scrub_workers (None = the CPUs divided
+    # between the API workers); up to
+    # scrub_queue_size more requests wait for a worker, the rest get 503 with
+    # Retry-After: retry_after_seconds
+    scrub_workers: int | None = None
+    scrub_queue_size: int = 8
+    retry_after_seconds: int = 5
+
+    # /images/jobs: uploads and the SQLite queue live in jobs_dir. Failed attempts
+    # are retried up to jobs_max_attempts times with exponential backoff, finished
+    # jobs are forgotten after jobs_ttl_seconds, and past jobs_max_queued waiting
+    # jobs new ones get 503
+    jobs_dir: Path = Path("/tmp/image_scrubber_api_jobs").resolve()
+    jobs_max_queued: int = 1000
+    jobs_max_attempts: int = 3
+    jobs_retry_backoff_seconds: float = 2.0
+    jobs_ttl_seconds: float = 24 * 3600
+    # A job whose process died is picked up again once its lease runs out
+    jobs_lease_seconds: float = 300
+    jobs_poll_seconds: float = 1.0
+    # Jobs running at once; 0 = half the scrub workers. Always below scrub_workers
+    # (when there is more than one), so the rest of the pool stays free for requests
+    jobs_max_running: int = 0
+
+    # Result cache (opt-in): reuse outputs for inputs already scrubbed
+    cache_dir: Path | None = None
+    cache_max_bytes: int = 1 << 30
+    cache_max_age_seconds: float = 7 * 24 * 3600
 
     class Config:
         frozen = True
 
 
-settings = Settings()
-settings.storage_dir.mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+ENV_PREFIX = "IMAGE_SCRUBBER_"
+
+
+def _from_env() -> dict[str, Any]:
+    """Read overrides such as ``IMAGE_SCRUBBER_CACHE_DIR`` from the environment.
+
+    An empty value or ``none`` resets an optional setting to ``None``
+    (``IMAGE_SCRUBBER_MEMORY_BUDGET=`` lifts the budget).
+    """
+    values: dict[str, Any] = {}
+    for name, field in Settings.model_fields.items():
+        raw = os.environ.get(ENV_PREFIX + name.upper())
+        if raw is None:
+            continue
+        optional = type(None) in get_args(field.annotation)
+        values[name] = None if optional and raw.strip().lower() in ("", "none") else raw
+    return values
+
+
+settings = Settings(**_from_env())
\ No newline at end of file
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    filename TEXT NOT NULL,
+    proposed TEXT NOT NULL,
+    input_sha256 TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    run_after REAL NOT NULL,
+    lease_until REAL,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, run_after);
+CREATE INDEX IF NOT EXISTS jobs_updated ON jobs (updated);
+"""
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+@dataclass(frozen=True)
+class Job:
+    id: str
+    state: str
+    filename: str
+    proposed: str
+    input_sha256: str | None
+    attempts: int
+    result: Dict[str, Any] | None
+    error: str | None
+    created: float
+    updated: float
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> Job:
+        return cls(
+            id=row["id"],
+            state=row["state"],
+            filename=row["filename"],
+            proposed=row["proposed"],
+            input_sha256=row["input_sha256"],
+            attempts=row["attempts"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            error=row["error"],
+            created=row["created"],
+            updated=row["updated"],
+        )
+
+    @property
+    def finished(self) -> bool:
+        return self.state in FINISHED
+
+
+class JobStore:
+    """SQLite queue of scrub jobs, with their inputs kept next to it on disk.
+
+    A job is ``queued`` until a runner claims it, which makes it ``running`` under a
+    lease; a runner that dies without finishing leaves the lease to expire and the
+    job is claimed again. Failures go back to the queue with a delay until
+    ``max_attempts`` is reached. Finished jobs (``done``, ``failed``, ``cancelled``)
+    are deleted ``ttl`` seconds after their last update.
+
+    Several processes may share the directory: claims are single UPDATE statements,
+    so a job is handed to one runner only.
+    """
+
+    def __init__(self, directory: str | Path, max_attempts: int = 3, ttl: float = 24 * 3600):
+        self.directory = Path(directory)
+        self.max_attempts = max_attempts
+        self.ttl = ttl
+        self.inputs = self.directory / "inputs"
+        self.inputs.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """SQLite connection for the calling thread."""
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.directory / "jobs.sqlite3", timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def new_id() -> str:
+        return uuid.uuid4().hex
+
+    def input_path(self, job_id: str) -> Path:
+        return self.inputs / job_id
+
+    def create(
+        self, job_id: str, filename: str, proposed: str, input_sha256: str | None = None
+    ) -> Job:
+        """Queue a job whose input is already at ``input_path(job_id)``."""
+        now = time.time()
+        with self.db:
+            self.db.execute(
+                "INSERT INTO jobs (id, state, filename, proposed, input_sha256, run_after,"
+                " created, updated) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, filename, proposed, input_sha256, now, now, now),
+            )
+        return self.get(job_id)  # type: ignore[return-value]
+
+    def get(self, job_id: str) -> Job | None:
+        row = self.db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row is not None else None
+
+    def queued(self) -> int:
+        (count,) = self.db.execute(
+            "SELECT COUNT(*) FROM jobs WHERE state = ?", (QUEUED,)
+        ).fetchone()
+        return int(count)
+
+    def claim(self, lease: float) -> Job | None:
+        """Move the oldest runnable job to ``running`` for ``lease`` seconds."""
+        now = time.time()
+        with self.db:
+            row = self.db.execute(
+                "UPDATE jobs SET state = ?, attempts = attempts + 1, lease_until = ?, updated = ?"
+                " WHERE id = (SELECT id FROM jobs WHERE (state = ? AND run_after <= ?)"
+                " OR (state = ? AND lease_until < ? AND attempts < ?)"
+                " ORDER BY created LIMIT 1) RETURNING *",
+                (RUNNING, now + lease, now, QUEUED, now, RUNNING, now, self.max_attempts),
+            ).fetchone()
+        return Job.from_row(row) if row is not None else None
+
+    def renew(self, job_ids: Iterable[str], lease: float) -> None:
+        """Extend the lease of jobs still being worked on."""
+        until = time.time() + lease
+        with self.db:
+            self.db.executemany(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND state = ?",
+                [(until, job_id, RUNNING) for job_id in job_ids],
+            )
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> bool:
+        """Store the result; ``False`` when the job was cancelled meanwhile."""
+        return self._finish(job_id, DONE, result=json.dumps(result))
+
+    def fail(self, job_id: str, error: str, retry_in: float | None = None) -> str:
+        """Record a failed attempt; return the new state.
+
+        With ``retry_in`` and attempts left the job is queued again after that
+        delay, otherwise it is ``failed`` for good.
+        """
+        job = self.get(job_id)
+        if job is None or job.state != RUNNING:
+            return job.state if job is not None else CANCELLED
+        if retry_in is not None and job.attempts < self.max_attempts:
+            with self.db:
+                self.db.execute(
+                    "UPDATE jobs SET state = ?, run_after = ?, lease_until = NULL, error = ?,"
+                    " updated = ? WHERE id = ? AND state = ?",
+                    (QUEUED, time.time() + retry_in, error, time.time(), job_id, RUNNING),
+                )
+            return QUEUED
+        self._finish(job_id, FAILED, error=error)
+        return FAILED
+
+    def _finish(self, job_id: str, state: str, **values: str) -> bool:
+        assignments = "".join(f", {column} = ?" for column in values)
+        with self.db:
+            updated = self.db.execute(
+                f"UPDATE jobs SET state = ?, lease_until = NULL, updated = ?{assignments}"
+                " WHERE id = ? AND state = ?",
+                (state, time.time(), *values.values(), job_id, RUNNING),
+            ).rowcount
+        if updated:
+            self.input_path(job_id).unlink(missing_ok=True)
+        return bool(updated)
+
+    def requeue(self, job_ids: Iterable[str]) -> None:
+        """Give back jobs interrupted by a shutdown, without charging the attempt."""
+        with self.db:
+            self.db.executemany(
+                "UPDATE jobs SET state = ?, attempts = attempts - 1, lease_until = NULL,"
+                " updated = ? WHERE id = ? AND state = ?",
+                [(QUEUED, time.time(), job_id, RUNNING) for job_id in job_ids],
+            )
+
+    def cancel(self, job_id: str) -> Job | None:
+        """Cancel a queued or running job; finished jobs are returned unchanged.
+
+        A running job keeps going in its worker, but its result is discarded.
+        """
+        with self.db:
+            self.db.execute(
+                "UPDATE jobs SET state = ?, lease_until = NULL, updated = ?"
+                " WHERE id = ? AND state IN (?, ?)",
+                (CANCELLED, time.time(), job_id, QUEUED, RUNNING),
+            )
+        job = self.get(job_id)
+        if job is not None and job.state == CANCELLED:
+            # A running job's worker has it open already, or fails on it harmlessly
+            self.input_path(job_id).unlink(missing_ok=True)
+        return job
+
+    def expire(self) -> List[str]:
+        """Delete finished jobs older than ``ttl``; return their ids.
+
+        Jobs whose runner died on their last attempt are marked ``failed`` first.
+        """
+        now = time.time()
+        with self.db:
+            self.db.execute(
+                "UPDATE jobs SET state = ?, lease_until = NULL, updated = ?,"
+                " error = COALESCE(error, 'El proceso terminó durante el trabajo')"
+                " WHERE state = ? AND lease_until < ? AND attempts >= ?",
+                (FAILED, now, RUNNING, now, self.max_attempts),
+            )
+            rows = self.db.execute(
+                "DELETE FROM jobs WHERE state IN (?, ?, ?) AND updated < ? RETURNING id",
+                (*FINISHED, now - self.ttl),
+            ).fetchall()
+        expired = [row["id"] for row in rows]
+        for job_id in expired:
+            self.input_path(job_id).unlink(missing_ok=True)
+        return expired
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Dict, List, Tuple
+
+from image_scrubber_core.instrumentation import StageEvent
+
+# Seconds; spans a sub-millisecond strip to a multi-second re-encode of a huge scan
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense, one series per label set."""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> (per-bucket counts incl. +Inf, sum)
+        self._series: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, labels: Labels = ()) -> None:
+        counts, total = self._series.setdefault(labels, ([0] * (len(self.buckets) + 1), [0.0]))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = _format_labels(labels, f'le="{bound}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            cumulative += counts[-1]
+            inf = _format_labels(labels, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{inf} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total[0]}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, labels: Labels = ()) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(labels)} {value}")
+        return lines
+
+
+class MetricsRegistry:
+    """In-process metrics rendered in the Prometheus text exposition format.
+
+    It doubles as a core ``ScrubObserver``: every scrub stage lands in a latency
+    histogram and byte counters labelled by stage. Values are per process; with
+    several workers scrape each one or aggregate in Prometheus.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.stage_seconds = Histogram(
+            "image_scrubber_stage_duration_seconds", "Time spent in each scrub stage."
+        )
+        self.stage_bytes_in = Counter(
+            "image_scrubber_stage_bytes_in_total", "Bytes read by each scrub stage."
+        )
+        self.stage_bytes_out = Counter(
+            "image_scrubber_stage_bytes_out_total", "Bytes written by each scrub stage."
+        )
+        self.stage_pixels = Counter(
+            "image_scrubber_stage_pixels_total", "Pixels handled by each scrub stage."
+        )
+        self.request_seconds = Histogram(
+            "image_scrubber_http_request_duration_seconds", "HTTP request latency."
+        )
+
+    def on_stage(self, event: StageEvent) -> None:
+        labels: Labels = (("stage", event.stage),)
+        with self._lock:
+            self.stage_seconds.observe(event.seconds, labels)
+            if event.bytes_in is not None:
+                self.stage_bytes_in.inc(event.bytes_in, labels)
+            if event.bytes_out is not None:
+                self.stage_bytes_out.inc(event.bytes_out, labels)
+            if event.width is not None and event.height is not None:
+                self.stage_pixels.inc(event.width * event.height, labels)
+
+    def observe_request(self, method: str, route: str, status: int, seconds: float) -> None:
+        labels: Labels = (("method", method), ("route", route), ("status", str(status)))
+        with self._lock:
+            self.request_seconds.observe(seconds, labels)
+
+    def render(self) -> str:
+        with self._lock:
+            lines: List[str] = []
+            for metric in (
+                self.stage_seconds,
+                self.stage_bytes_in,
+                self.stage_bytes_out,
+                self.stage_pixels,
+                self.request_seconds,
+            ):
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
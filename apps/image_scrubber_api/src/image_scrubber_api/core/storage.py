@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from image_scrubber_core.security.hashing import FileHasher
+
+# sha256 is NULL while a name is reserved but its file is still being written.
+# Digests are stored as 32-byte blobs and the table is clustered on the name, so an
+# entry costs little more than the name itself.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY,
+    sha256 BLOB,
+    size INTEGER NOT NULL DEFAULT 0,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS files_last_access ON files (last_access);
+"""
+
+# Downloads refresh last_access at most this often, so reads rarely write
+_TOUCH_INTERVAL = 60.0
+# Reservations whose file never got committed (the process died) are dropped after
+_STALE_RESERVATION = 3600.0
+
+
+class OutputStore:
+    """Published outputs, sharded under ``directory`` and indexed in SQLite.
+
+    A file lives at ``ab/cd/<name>``, where ``abcd`` starts the sha1 of its name, so
+    no directory grows past a few hundred entries and finding a file needs neither
+    a listing nor the index. The index keeps the sha256 (the download ETag), size
+    and last access of each file.
+
+    ``sweep`` removes files not accessed for ``ttl`` seconds, then the least recently
+    used ones until the total fits in ``max_bytes`` (either limit ``None`` = off).
+    Names are reserved in the index before their file is written, which makes them
+    unique across every process sharing the directory.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        max_bytes: int | None = None,
+        ttl: float | None = None,
+        index_path: str | Path | None = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.index_path = Path(index_path or self.directory / ".index.sqlite3")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """SQLite connection for the calling thread."""
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.index_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def path_for(self, name: str) -> Path:
+        digest = hashlib.sha1(name.encode("utf-8")).hexdigest()
+        return self.directory / digest[:2] / digest[2:4] / name
+
+    def reserve(self, name: str) -> bool:
+        """Claim ``name`` for a file about to be written; ``False`` if it is taken."""
+        now = time.time()
+        with self.db:
+            claimed = self.db.execute(
+                "INSERT OR IGNORE INTO files (name, created, last_access) VALUES (?, ?, ?)",
+                (name, now, now),
+            ).rowcount
+        if claimed:
+            self.path_for(name).parent.mkdir(parents=True, exist_ok=True)
+        return bool(claimed)
+
+    def commit(self, name: str, sha256: str) -> None:
+        """Publish the file written for a reserved ``name``."""
+        size = self.path_for(name).stat().st_size
+        now = time.time()
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                (name, bytes.fromhex(sha256), size, now, now),
+            )
+
+    def discard(self, name: str) -> None:
+        """Drop ``name`` and its file, whether reserved or published."""
+        with self.db:
+            self.db.execute("DELETE FROM files WHERE name = ?", (name,))
+        self.path_for(name).unlink(missing_ok=True)
+
+    def get(self, name: str) -> Tuple[Path, str] | None:
+        """Path and sha256 of the published file ``name``, or ``None``."""
+        if Path(name).name != name or name.startswith("."):
+            return None
+        row = self.db.execute(
+            "SELECT sha256, last_access FROM files WHERE name = ?", (name,)
+        ).fetchone()
+        if row is None:
+            return self._adopt(name)
+        sha, last_access = row
+        if sha is None:
+            return None
+
+        path = self.path_for(name)
+        if not path.is_file():
+            self.discard(name)
+            return None
+        now = time.time()
+        if now - last_access > _TOUCH_INTERVAL:
+            with self.db:
+                self.db.execute("UPDATE files SET last_access = ? WHERE name = ?", (now, name))
+        return path, sha.hex()
+
+    def _adopt(self, name: str) -> Tuple[Path, str] | None:
+        # Written flat into the directory by an older version: hashed once and moved
+        # into its shard, then served like any other file
+        legacy = self.directory / name
+        if not legacy.is_file() or not self.reserve(name):
+            return None
+        sha = FileHasher.sha256(legacy)
+        os.replace(legacy, self.path_for(name))
+        self.commit(name, sha)
+        return self.path_for(name), sha
+
+    def total_bytes(self) -> int:
+        (total,) = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()
+        return int(total)
+
+    def sweep(self, now: float | None = None) -> int:
+        """Apply the TTL and size limits; return how many files were removed."""
+        now = time.time() if now is None else now
+        doomed: List[str] = []
+        with self.db:
+            doomed += [
+                name
+                for (name,) in self.db.execute(
+                    "SELECT name FROM files WHERE sha256 IS NULL AND created < ?",
+                    (now - _STALE_RESERVATION,),
+                )
+            ]
+            if self.ttl is not None:
+                doomed += [
+                    name
+                    for (name,) in self.db.execute(
+                        "SELECT name FROM files WHERE sha256 IS NOT NULL AND last_access < ?",
+                        (now - self.ttl,),
+                    )
+                ]
+            self.db.executemany("DELETE FROM files WHERE name = ?", [(n,) for n in doomed])
+
+            if self.max_bytes is not None:
+                total = self.total_bytes()
+                if total > self.max_bytes:
+                    lru = self.db.execute(
+                        "SELECT name, size FROM files WHERE sha256 IS NOT NULL"
+                        " ORDER BY last_access"
+                    )
+                    evicted: List[str] = []
+                    for name, size in lru:
+                        if total <= self.max_bytes:
+                            break
+                        evicted.append(name)
+                        total -= size
+                    self.db.executemany(
+                        "DELETE FROM files WHERE name = ?", [(n,) for n in evicted]
+                    )
+                    doomed += evicted
+
+        # Rows go first: a file is never listed in the index after it is deleted
+        for name in doomed:
+            self.path_for(name).unlink(missing_ok=True)
+        return len(doomed)
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+import hashlib
+import io
+import os
+import tempfile
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Collection, Dict, List
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    import multipart  # type: ignore[no-redef]
+    from multipart.multipart import parse_options_header  # type: ignore[no-redef]
+
+if TYPE_CHECKING:
+    from python_multipart.multipart import MultipartCallbacks
+
+# Room for the multipart boundaries and part headers around the file itself
+_ENVELOPE_BYTES = 64 * 1024
+# Plain form fields (seo_name...) are tiny; anything bigger is not a legit request
+_MAX_FIELD_BYTES = 4096
+# Once a file is spooled to disk the body is parsed off the event loop, in batches
+# of at least this much so the thread hand-off stays cheap
+_OFFLOAD_BYTES = 1 << 20
+
+
+@dataclass
+class StreamedUpload:
+    """The file part of a multipart request, received without buffering it whole.
+
+    Small uploads are kept in ``data``; larger ones were spilled to the temporary
+    file at ``path``. Either way ``source`` can be handed to a worker process.
+    """
+
+    filename: str
+    size: int
+    sha256: str
+    data: bytes | None = None
+    path: Path | None = None
+    fields: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def source(self) -> bytes | Path:
+        return self.path if self.path is not None else self.data  # type: ignore[return-value]
+
+    def close(self) -> None:
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+class _Spool:
+    """Memory buffer that moves to a named temporary file past ``max_memory``."""
+
+    def __init__(self, max_memory: int, directory: Path | None = None) -> None:
+        self.max_memory = max_memory
+        self.directory = directory
+        self.buffer: io.BytesIO | None = io.BytesIO()
+        self.path: Path | None = None
+        self._fp: BinaryIO | None = None
+
+    def write(self, chunk: bytes) -> None:
+        if self.buffer is not None and self.buffer.tell() + len(chunk) > self.max_memory:
+            fd, name = tempfile.mkstemp(prefix="upload-", dir=self.directory)
+            self.path = Path(name)
+            self._fp = os.fdopen(fd, "wb")
+            self._fp.write(self.buffer.getbuffer())
+            self.buffer = None
+        if self._fp is not None:
+            self._fp.write(chunk)
+        else:
+            self.buffer.write(chunk)  # type: ignore[union-attr]
+
+    def finish(self) -> bytes | None:
+        """Flush to disk; return the content when it never left memory."""
+        if self._fp is not None:
+            self._fp.close()
+            return None
+        return self.buffer.getvalue()  # type: ignore[union-attr]
+
+    def discard(self) -> None:
+        if self._fp is not None:
+            self._fp.close()
+        if self.path is not None:
+            self.path.unlink(missing_ok=True)
+
+
+def _too_large(max_bytes: int) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"La imagen supera el tamaño máximo de {max_bytes // 2**20} MiB",
+    )
+
+
+class _UploadReceiver:
+    """python-multipart callbacks that spool the file parts and hash them on the fly."""
+
+    def __init__(
+        self,
+        file_field: str,
+        max_bytes: int,
+        spool_bytes: int,
+        allowed_suffixes: Collection[str] | None,
+        spool_dir: Path | None = None,
+        max_files: int = 1,
+        max_total_bytes: int | None = None,
+        spill_suffixes: Collection[str] = (),
+    ) -> None:
+        self.file_field = file_field
+        self.max_bytes = max_bytes
+        self.spool_bytes = spool_bytes
+        self.allowed_suffixes = allowed_suffixes
+        self.spool_dir = spool_dir
+        self.max_files = max_files
+        self.max_total_bytes = max_total_bytes if max_total_bytes is not None else max_bytes
+        self.spill_suffixes = spill_suffixes
+
+        self.uploads: List[StreamedUpload] = []
+        self.fields: Dict[str, str] = {}
+        self.total = 0
+        self.in_memory = 0
+
+        # The file part being received
+        self.filename: str | None = None
+        self.file: _Spool | None = None
+        self.size = 0
+        self.hash = hashlib.sha256()
+
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._part_name: str | None = None
+        self._in_file = False
+        self._field_data = bytearray()
+
+    @property
+    def spilled(self) -> bool:
+        """Whether the file part being received is written to disk."""
+        return self.file is not None and self.file.path is not None
+
+    def callbacks(self) -> MultipartCallbacks:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self) -> None:
+        self._disposition = b""
+        self._part_name = None
+        self._in_file = False
+        self._field_data = bytearray()
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        self._part_name = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" not in options:
+            return
+
+        if self._part_name != self.file_field:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Se esperaban archivos en el campo '{self.file_field}'",
+            )
+        if len(self.uploads) >= self.max_files:
+            detail = (
+                f"Se esperaba un único archivo en el campo '{self.file_field}'"
+                if self.max_files == 1
+                else f"Demasiados archivos (máximo {self.max_files})"
+            )
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=detail)
+        self.filename = options[b"filename"].decode("utf-8", "replace")
+        if not self.filename:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Filename missing")
+        # Checked here, before a single byte of the image is received
+        suffix = Path(self.filename).suffix.lower()
+        if self.allowed_suffixes is not None and suffix not in self.allowed_suffixes:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Formato no soportado"
+            )
+        # spool_bytes is shared by all the files of the request; once it is used up,
+        # and always for spill_suffixes, the part goes straight to disk
+        memory = 0 if suffix in self.spill_suffixes else self.spool_bytes - self.in_memory
+        self.file = _Spool(max(memory, 0), self.spool_dir)
+        self.size = 0
+        self.hash = hashlib.sha256()
+        self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        chunk = data[start:end]
+        if self._in_file:
+            self.size += len(chunk)
+            self.total += len(chunk)
+            if self.size > self.max_bytes:
+                raise _too_large(self.max_bytes)
+            if self.total > self.max_total_bytes:
+                raise _too_large(self.max_total_bytes)
+            self.hash.update(chunk)
+            self.file.write(chunk)  # type: ignore[union-attr]
+        else:
+            self._field_data += chunk
+            if len(self._field_data) > _MAX_FIELD_BYTES:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Campo de formulario demasiado largo",
+                )
+
+    def on_part_end(self) -> None:
+        if self._in_file:
+            data = self.file.finish()  # type: ignore[union-attr]
+            if data is not None:
+                self.in_memory += len(data)
+            self.uploads.append(
+                StreamedUpload(
+                    filename=self.filename,  # type: ignore[arg-type]
+                    size=self.size,
+                    sha256=self.hash.hexdigest(),
+                    data=data,
+                    path=self.file.path,  # type: ignore[union-attr]
+                    fields=self.fields,
+                )
+            )
+            self.file = None
+        elif self._part_name:
+            self.fields[self._part_name] = self._field_data.decode("utf-8", "replace")
+        self._in_file = False
+
+    def discard(self) -> None:
+        if self.file is not None:
+            self.file.discard()
+        for upload in self.uploads:
+            upload.close()
+
+
+async def receive_uploads(
+    request: Request,
+    file_field: str = "files",
+    max_bytes: int = 100 * 2**20,
+    spool_bytes: int = 8 * 2**20,
+    allowed_suffixes: Collection[str] | None = None,
+    spool_dir: Path | None = None,
+    max_files: int = 1,
+    max_total_bytes: int | None = None,
+    spill_suffixes: Collection[str] = (),
+) -> List[StreamedUpload]:
+    """Stream every ``file_field`` part of a multipart request into a spool.
+
+    The body is consumed chunk by chunk as it arrives: each file is hashed on the
+    way, kept in memory while the request has used less than ``spool_bytes`` and
+    spilled to a temporary file in ``spool_dir`` beyond that. The request is
+    rejected with 413 as soon as a file passes ``max_bytes`` or all of them pass
+    ``max_total_bytes`` (immediately, when Content-Length already says so), and
+    with 400 past ``max_files`` files. Plain form fields are shared by all uploads.
+    """
+    limit = max_total_bytes if max_total_bytes is not None else max_bytes
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > limit + _ENVELOPE_BYTES * max_files:
+        raise _too_large(limit)
+
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Se esperaba multipart/form-data"
+        )
+
+    receiver = _UploadReceiver(
+        file_field,
+        max_bytes,
+        spool_bytes,
+        allowed_suffixes,
+        spool_dir,
+        max_files=max_files,
+        max_total_bytes=max_total_bytes,
+        spill_suffixes=spill_suffixes,
+    )
+    parser = multipart.MultipartParser(boundary, receiver.callbacks())
+    try:
+        # Parsing, hashing and spooling run on the event loop while the file fits in
+        # memory; after the first spill they run in the threadpool, so disk writes
+        # of one large upload do not stall every other request
+        offload = False
+        pending = bytearray()
+        async for chunk in request.stream():
+            offload = offload or receiver.spilled
+            if not offload:
+                parser.write(chunk)
+                continue
+            pending += chunk
+            if len(pending) >= _OFFLOAD_BYTES:
+                await run_in_threadpool(parser.write, bytes(pending))
+                pending.clear()
+        if pending:
+            await run_in_threadpool(parser.write, bytes(pending))
+        parser.finalize()
+        if not receiver.uploads:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Filename missing"
+            )
+    except BaseException:
+        receiver.discard()
+        raise
+    return receiver.uploads
+
+
+async def receive_upload(
+    request: Request,
+    file_field: str = "file",
+    max_bytes: int = 100 * 2**20,
+    spool_bytes: int = 8 * 2**20,
+    allowed_suffixes: Collection[str] | None = None,
+    spool_dir: Path | None = None,
+) -> StreamedUpload:
+    """Stream the single ``file_field`` part of a multipart request into a spool.
+
+    See ``receive_uploads``; a second file part is rejected with 400.
+    """
+    uploads = await receive_uploads(
+        request, file_field, max_bytes, spool_bytes, allowed_suffixes, spool_dir
+    )
+    return uploads[0]
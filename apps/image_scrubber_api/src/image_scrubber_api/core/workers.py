@@ -0,0 +1,220 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import io
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from importlib import import_module
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, List, Tuple, cast
+
+from image_scrubber_core.cache.result_cache import ScrubCache
+from image_scrubber_core.instrumentation import StageEvent, add_observer, emit, remove_observer
+from image_scrubber_core.metadata.scrubber import ImageScrubber, ScrubOptions
+
+
+class WorkerPoolSaturated(Exception):
+    """Every worker is busy and the wait queue is full."""
+
+
+@dataclass(frozen=True)
+class ArchiveMember:
+    """One image inside a ZIP on disk, read only by the worker that scrubs it."""
+
+    archive: Path
+    name: str
+
+    def open(self) -> BinaryIO:
+        archive = zipfile.ZipFile(self.archive)
+        # The member stream keeps working after the archive handle is closed
+        with archive:
+            return cast(BinaryIO, archive.open(self.name))
+
+    def read(self) -> bytes:
+        with zipfile.ZipFile(self.archive) as archive:
+            return archive.read(self.name)
+
+
+ScrubSource = bytes | Path | ArchiveMember
+
+
+def warm_imports() -> None:
+    """Import what the first scrub would otherwise import while it runs."""
+    import piexif  # noqa: F401
+    from PIL import Image
+
+    # Registers every format plugin (TIFF, WebP...) that Image.open loads lazily
+    Image.init()
+    import_module("image_scrubber_core.metadata.scrubber")
+
+
+class _Collector:
+    def __init__(self) -> None:
+        self.events: List[StageEvent] = []
+
+    def on_stage(self, event: StageEvent) -> None:
+        self.events.append(event)
+
+
+def _scrub_job(
+    source: ScrubSource,
+    output_path: Path | None,
+    options: ScrubOptions,
+    cache: ScrubCache | None,
+    input_sha256: str | None,
+) -> Tuple[bool, str, str | None, bytes | None, List[StageEvent]]:
+    """Runs in a worker process; stage events travel back with the result.
+
+    Without ``output_path`` the output is returned instead of written. ZIP members
+    are hashed here, where they are inflated, so the input sha256 is returned too.
+    """
+    if isinstance(source, ArchiveMember):
+        source = source.read()
+        if input_sha256 is None:
+            input_sha256 = hashlib.sha256(source).hexdigest()
+    output = io.BytesIO() if output_path is None else output_path
+    collector = _Collector()
+    add_observer(collector)
+    try:
+        had_meta, sha = ImageScrubber.scrub(
+            source, output, options, cache=cache, input_sha256=input_sha256
+        )
+    finally:
+        remove_observer(collector)
+    data = output.getvalue() if isinstance(output, io.BytesIO) else None
+    return had_meta, sha, input_sha256, data, collector.events
+
+
+class ScrubExecutor:
+    """Process pool for the CPU-bound scrub, with admission control.
+
+    At most ``max_workers + max_queue`` requests hold a slot at once: that many
+    uploads can be in progress or waiting for a worker, and any request beyond it
+    is turned away immediately instead of piling up on the event loop.
+    """
+
+    def __init__(
+        self, max_workers: int | None = None, max_queue: int = 8, prewarm: bool = False
+    ) -> None:
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.prewarm = prewarm
+        self._pool: ProcessPoolExecutor | None = None
+        # Only touched from the event loop thread, so no lock is needed
+        self._active = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs an event loop and threads is unsafe
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_imports if self.prewarm else None,
+            )
+        return self._pool
+
+    async def warm(self) -> None:
+        """Start every worker process now rather than on the first requests."""
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        # No worker is idle yet, so each submission spawns one more process
+        await asyncio.gather(
+            *(loop.run_in_executor(pool, os.getpid) for _ in range(self.max_workers))
+        )
+
+    def acquire(self) -> None:
+        """Take one of the ``capacity`` slots or raise ``WorkerPoolSaturated``.
+
+        For a slot that outlives the handler (a streamed response); otherwise use
+        ``slot()``. Every successful call must be paired with ``release()``.
+        """
+        if self._active >= self.capacity:
+            raise WorkerPoolSaturated()
+        self._active += 1
+
+    def release(self) -> None:
+        self._active -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block."""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def scrub(
+        self,
+        source: ScrubSource,
+        output_path: Path,
+        options: ScrubOptions,
+        cache: ScrubCache | None = None,
+        input_sha256: str | None = None,
+    ) -> Tuple[bool, str, str | None]:
+        """Scrub ``source`` into ``output_path``.
+
+        Returns whether it had metadata, the output sha256 and the input sha256 (the
+        one given, or the digest of a ZIP member).
+        """
+        had_meta, sha, input_sha, _ = await self._run(
+            source, output_path, options, cache, input_sha256
+        )
+        return had_meta, sha, input_sha
+
+    async def scrub_bytes(
+        self,
+        source: ScrubSource,
+        options: ScrubOptions,
+        cache: ScrubCache | None = None,
+        input_sha256: str | None = None,
+    ) -> Tuple[bool, str, bytes]:
+        """Like ``scrub``, but return the output instead of writing it anywhere."""
+        had_meta, sha, _, data = await self._run(source, None, options, cache, input_sha256)
+        return had_meta, sha, data  # type: ignore[return-value]
+
+    async def _run(
+        self,
+        source: ScrubSource,
+        output_path: Path | None,
+        options: ScrubOptions,
+        cache: ScrubCache | None,
+        input_sha256: str | None,
+    ) -> Tuple[bool, str, str | None, bytes | None]:
+        future = self._executor().submit(
+            _scrub_job, source, output_path, options, cache, input_sha256
+        )
+        try:
+            had_meta, sha, input_sha, data, events = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            # A job already running in a worker cannot be stopped: wait until it is
+            # done, so the caller can clean up whatever it writes
+            if not future.cancel():
+                await asyncio.wait([asyncio.wrap_future(future)])
+            raise
+        except BrokenProcessPool:
+            # A worker died (OOM kill...); start a fresh pool for the next request
+            self.shutdown(wait=False)
+            raise
+        for event in events:
+            emit(event)
+        return had_meta, sha, input_sha, data
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait, cancel_futures=True)
+            self._pool = None
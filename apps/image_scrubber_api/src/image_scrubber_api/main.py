@@ -1,10 +1,53 @@
 from __future__ import annotations
 
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Awaitable, Callable
+
 import uvicorn
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
+from fastapi.concurrency import run_in_threadpool
 
-from image_scrubber_api.api.routes_images import router as images_router
+from image_scrubber_core.instrumentation import add_observer
+from image_scrubber_api.api.routes_images import executor, router as images_router, storage
+from image_scrubber_api.api.routes_jobs import router as jobs_router, runner
+from image_scrubber_api.api.routes_metrics import router as metrics_router
 from image_scrubber_api.core.config import settings
+from image_scrubber_api.core.metrics import metrics
+from image_scrubber_api.core.workers import warm_imports
+
+logger = logging.getLogger(__name__)
+
+
+async def sweep_storage() -> None:
+    """Apply the storage TTL and size limits periodically."""
+    while True:
+        await asyncio.sleep(settings.storage_sweep_seconds)
+        try:
+            removed = await run_in_threadpool(storage.sweep)
+        except Exception:
+            logger.exception("Storage sweep failed")
+        else:
+            if removed:
+                logger.info("Storage sweep removed %d files", removed)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if settings.prewarm:
+        # Done before the server starts accepting connections
+        await run_in_threadpool(warm_imports)
+        await executor.warm()
+    tasks = [asyncio.create_task(runner.run()), asyncio.create_task(sweep_storage())]
+    yield
+    for task in tasks:
+        task.cancel()
+    # The server has already drained in-flight requests; give running jobs the
+    # same grace period before they are requeued
+    await runner.stop(timeout=settings.graceful_shutdown_seconds)
+    executor.shutdown()
 
 
 def create_app() -> FastAPI:
@@ -12,9 +55,29 @@ def create_app() -> FastAPI:
         title=settings.api_name,
         version=settings.api_version,
         description="API para limpiar metadatos de imágenes y optimizar nombres SEO.",
+        lifespan=lifespan,
     )
 
     app.include_router(images_router)
+    app.include_router(jobs_router)
+    app.include_router(metrics_router)
+
+    add_observer(metrics)
+
+    @app.middleware("http")
+    async def observe_latency(
+        request: Request, call_next: Callable[[Request], Awaitable[Response]]
+    ) -> Response:
+        start = time.perf_counter()
+        response = await call_next(request)
+        # Label by route template, not by raw path, to keep the series bounded
+        route = request.scope.get("route")
+        path = getattr(route, "path", "unmatched")
+        metrics.observe_request(
+            request.method, path, response.status_code, time.perf_counter() - start
+        )
+        return response
+
     return app
 
 
@@ -22,7 +85,19 @@ app = create_app()
 
 
 def run() -> None:
-    uvicorn.run("image_scrubber_api.main:app", host="0.0.0.0", port=8000, reload=True)
+    """Serve the API as configured by the IMAGE_SCRUBBER_* settings."""
+    uvicorn.run(
+        "image_scrubber_api.main:app",
+        host=settings.host,
+        port=settings.port,
+        workers=settings.workers,
+        reload=settings.reload,
+        timeout_keep_alive=settings.keep_alive_seconds,
+        limit_concurrency=settings.limit_concurrency,
+        backlog=settings.backlog,
+        limit_max_requests=settings.max_requests,
+        timeout_graceful_shutdown=settings.graceful_shutdown_seconds,
+    )
 
 
 if __name__ == "__main__":
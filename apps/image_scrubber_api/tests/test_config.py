@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from image_scrubber_api.core.config import Settings, _from_env
+
+
+def test_empty_or_none_resets_optional_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setenv("IMAGE_SCRUBBER_MAX_DIMENSION", "")
+    monkeypatch.setenv("IMAGE_SCRUBBER_MEMORY_BUDGET", "None")
+    monkeypatch.setenv("IMAGE_SCRUBBER_STORAGE_MAX_BYTES", "1024")
+    monkeypatch.setenv("IMAGE_SCRUBBER_CACHE_DIR", "/tmp/cache")
+
+    settings = Settings(**_from_env())
+
+    assert settings.max_dimension is None
+    assert settings.memory_budget is None
+    assert settings.storage_max_bytes == 1024
+    assert settings.cache_dir == Path("/tmp/cache")
+
+
+def test_empty_value_is_kept_for_required_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    # An empty output format means "keep the format of each upload"
+    monkeypatch.setenv("IMAGE_SCRUBBER_OUTPUT_FORMAT", "")
+    assert Settings(**_from_env()).output_format == ""
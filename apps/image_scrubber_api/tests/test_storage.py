@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+from image_scrubber_core.filenames.sanitizer import FilenameAllocator
+from image_scrubber_api.core.storage import OutputStore
+
+
+def _publish(store: OutputStore, name: str, data: bytes) -> Path:
+    assert store.reserve(name)
+    path = store.path_for(name)
+    path.write_bytes(data)
+    store.commit(name, hashlib.sha256(data).hexdigest())
+    return path
+
+
+def _age(store: OutputStore, name: str, last_access: float) -> None:
+    with store.db:
+        store.db.execute("UPDATE files SET last_access = ? WHERE name = ?", (last_access, name))
+
+
+def test_reserve_is_exclusive_until_discarded(tmp_path: Path) -> None:
+    store = OutputStore(tmp_path)
+    assert store.reserve("a.jpg")
+    assert not store.reserve("a.jpg")
+    # Reserved but not committed yet: not served
+    assert store.get("a.jpg") is None
+
+    store.discard("a.jpg")
+    assert store.reserve("a.jpg")
+
+
+def test_sweep_drops_expired_files(tmp_path: Path) -> None:
+    store = OutputStore(tmp_path, ttl=100)
+    old = _publish(store, "old.jpg", b"x" * 10)
+    new = _publish(store, "new.jpg", b"y" * 10)
+    _age(store, "old.jpg", 1000.0)
+    _age(store, "new.jpg", 1950.0)
+
+    assert store.sweep(now=2000.0) == 1
+    assert not old.exists()
+    assert new.exists()
+    assert store.get("old.jpg") is None
+    assert store.get("new.jpg") == (new, hashlib.sha256(b"y" * 10).hexdigest())
+
+
+def test_sweep_evicts_least_recently_used_past_max_bytes(tmp_path: Path) -> None:
+    store = OutputStore(tmp_path, max_bytes=25)
+    for i, name in enumerate(("a.jpg", "b.jpg", "c.jpg")):
+        _publish(store, name, b"z" * 10)
+        _age(store, name, 1000.0 + i)
+
+    assert store.sweep(now=2000.0) == 1
+    assert store.total_bytes() == 20
+    assert store.get("a.jpg") is None
+    assert store.get("b.jpg") is not None
+    assert store.get("c.jpg") is not None
+
+
+def test_sweep_drops_stale_reservations(tmp_path: Path) -> None:
+    store = OutputStore(tmp_path)
+    assert store.reserve("pending.jpg")
+    with store.db:
+        store.db.execute("UPDATE files SET created = 0 WHERE name = 'pending.jpg'")
+
+    assert store.sweep() == 1
+    assert store.reserve("pending.jpg")
+
+
+def test_swept_names_are_allocated_again(tmp_path: Path) -> None:
+    store = OutputStore(tmp_path, ttl=100)
+    names = FilenameAllocator(claim=store.reserve)
+    first = names.allocate("photo", ".jpg")
+    assert names.allocate("photo", ".jpg") == "photo-2.jpg"
+    store.path_for(first).write_bytes(b"x")
+    store.commit(first, hashlib.sha256(b"x").hexdigest())
+    _age(store, first, 0.0)
+
+    store.sweep()
+    # The API allocates with a fresh allocator per request: only the index counts
+    assert FilenameAllocator(claim=store.reserve).allocate("photo", ".jpg") == "photo.jpg"
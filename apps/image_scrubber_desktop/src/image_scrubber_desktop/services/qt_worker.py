@@ -4,14 +4,13 @@ from pathlib import Path
 
 from PySide6.QtCore import QThread, Signal
 
-from image_scrubber_core.metadata.cleaner import MetadataCleaner
-from image_scrubber_core.metadata.writer import MetadataWriter
+from image_scrubber_core.metadata.scrubber import ImageScrubber
 from image_scrubber_core.filenames.sanitizer import FilenameSanitizer
 
 
 class ImageProcessorWorker(QThread):
     progress = Signal(str)
-    finished = Signal(str, bool)
+    finished = Signal(str, bool, str)
     error = Signal(str)
 
     def __init__(self, image_path: str, new_filename: str, output_directory: str | None):
@@ -22,20 +21,16 @@ class ImageProcessorWorker(QThread):
 
     def run(self) -> None:
         try:
-            self.progress.emit("Limpiando metadatos…")
-            cleaner = MetadataCleaner()
-            img, had_meta = cleaner.clean(self.image_path)
-
             self.progress.emit("Generando nombre…")
             sanitized = FilenameSanitizer.sanitize(self.new_filename)
 
             out_dir = Path(self.output_directory or Path(self.image_path).parent)
             out_path = out_dir / sanitized
 
-            self.progress.emit("Guardando imagen...")
-            MetadataWriter.add_generic_and_save(img, out_path)
+            self.progress.emit("Limpiando metadatos y guardando imagen…")
+            had_meta, sha = ImageScrubber.scrub(self.image_path, out_path)
 
-            self.finished.emit(str(out_path), had_meta)
+            self.finished.emit(str(out_path), had_meta, sha)
 
         except Exception as exc:  # pragma: no cover - defensive
             self.error.emit(str(exc))
\ No newline at end of file
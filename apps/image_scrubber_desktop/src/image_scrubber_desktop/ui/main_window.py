@@ -21,9 +21,6 @@ from PySide6.QtWidgets import (
 )
 
 from image_scrubber_core.filenames.sanitizer import FilenameSanitizer
-from image_scrubber_core.metadata.cleaner import MetadataCleaner
-from image_scrubber_core.metadata.writer import MetadataWriter
-from image_scrubber_core.security.hashing import FileHasher
 from image_scrubber_desktop.services.qt_worker import ImageProcessorWorker
 
 
@@ -232,13 +229,11 @@ class MainWindow(QMainWindow):
     def _on_progress(self, msg: str) -> None:
         self.status_label.setText(msg)
 
-    def _on_finished(self, output_path: str, had_metadata: bool) -> None:
+    def _on_finished(self, output_path: str, had_metadata: bool, sha: str) -> None:
         self.progress_bar.hide()
         self.process_btn.setEnabled(True)
         self.select_btn.setEnabled(True)
 
-        sha = FileHasher.sha256(output_path)
-
         self.status_label.setText("✓ Procesado correctamente")
         QMessageBox.information(
             self,
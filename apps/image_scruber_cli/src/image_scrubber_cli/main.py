@@ -1,19 +1,31 @@
 from __future__ import annotations
 
+from functools import lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
 
 import typer
-from rich.console import Console
-from rich.table import Table
 
-from image_scrubber_core.metadata.cleaner import MetadataCleaner
-from image_scrubber_core.metadata.writer import MetadataWriter
-from image_scrubber_core.filenames.sanitizer import FilenameSanitizer
-from image_scrubber_core.security.hashing import FileHasher
+# rich and the core (Pillow, piexif) are imported inside the commands: the CLI is
+# run thousands of times from scripts and --help should not pay for them.
+if TYPE_CHECKING:
+    from rich.console import Console
+
+    from image_scrubber_core.metadata.scrubber import ScrubOptions
 
 app = typer.Typer(help="CLI para limpiar metadatos de imágenes y optimizar nombres SEO.")
-console = Console()
+
+# Inputs picked up by scrub-dir when no --include is given
+DEFAULT_INCLUDE = ["*.jpg", "*.jpeg", "*.png", "*.webp", "*.tif", "*.tiff", "*.bmp"]
+# scrub-dir keeps its manifest here, inside the output directory, unless told otherwise
+MANIFEST_NAME = ".image-scrubber-manifest.sqlite3"
+
+
+@lru_cache(maxsize=None)
+def console() -> Console:
+    from rich.console import Console
+
+    return Console()
 
 
 @app.command()
@@ -28,14 +40,62 @@ def scrub(
         "-n",
         help="Nuevo nombre SEO (sin extensión). Si no se proporciona, se usa el nombre original.",
     ),
+    profile: str = typer.Option(
+        "balanced", "--profile", "-p", help="Perfil del codificador: fast, balanced o smallest"
+    ),
+    output_format: str = typer.Option(
+        "JPEG",
+        "--format",
+        "-f",
+        help="Formato de salida: JPEG, PNG, WEBP, TIFF o 'keep' para conservar el original",
+    ),
+    max_dimension: Optional[int] = typer.Option(
+        None,
+        "--max-dimension",
+        min=1,
+        help="Lado máximo en píxeles; las imágenes grandes se decodifican ya reducidas",
+    ),
+    memory_budget: Optional[int] = typer.Option(
+        None,
+        "--memory-budget",
+        min=1,
+        help="Memoria máxima (MiB) para decodificar; las imágenes que no caben se rechazan",
+    ),
+    downscale_to_budget: bool = typer.Option(
+        False,
+        "--downscale-to-budget",
+        help="Reducir las imágenes que no caben en --memory-budget en lugar de rechazarlas",
+    ),
+    cache_dir: Optional[Path] = typer.Option(
+        None,
+        "--cache-dir",
+        help="Caché de resultados: reutiliza la salida si la imagen ya se limpió antes",
+    ),
+    log_stages: bool = typer.Option(
+        False,
+        "--log-stages",
+        help="Escribir en stderr la duración de cada etapa en formato key=value",
+    ),
 ) -> None:
     """Clean EXIF metadata, add generic metadata and rename the image for SEO."""
+    from rich.table import Table
+
+    from image_scrubber_core.cache.result_cache import ScrubCache
+    from image_scrubber_core.filenames.sanitizer import FilenameSanitizer
+    from image_scrubber_core.metadata.scrubber import ImageScrubber
+
+    if log_stages:
+        _enable_stage_logging()
+
     try:
-        cleaner = MetadataCleaner()
-        img, had_meta = cleaner.clean(input_path)
+        options = _scrub_options(
+            profile, output_format, max_dimension, memory_budget, downscale_to_budget
+        )
 
         proposed_name = name or input_path.stem
-        sanitized = FilenameSanitizer.sanitize(proposed_name)
+        sanitized = FilenameSanitizer.sanitize(
+            proposed_name, ImageScrubber.extension_for(input_path, options)
+        )
 
         out_dir = output_dir or input_path.parent
         out_path = out_dir / sanitized
@@ -48,9 +108,8 @@ def scrub(
                 typer.echo("Operación cancelada.")
                 raise typer.Exit(code=1)
 
-        MetadataWriter.add_generic_and_save(img, out_path)
-
-        sha = FileHasher.sha256(out_path)
+        cache = ScrubCache(cache_dir) if cache_dir else None
+        had_meta, sha = ImageScrubber.scrub(input_path, out_path, options, cache=cache)
 
         table = Table(title="Resultado del Scrub", show_header=True, header_style="bold cyan")
         table.add_column("Campo")
@@ -61,12 +120,283 @@ def scrub(
         table.add_row("Metadatos originales", "Eliminados" if had_meta else "No existían")
         table.add_row("SHA256", sha)
 
-        console.print(table)
+        console().print(table)
 
     except Exception as exc:
-        console.print(f"[red]Error:[/red] {exc}")
+        console().print(f"[red]Error:[/red] {exc}")
         raise typer.Exit(code=1)
 
 
+@app.command("scrub-dir")
+def scrub_dir(
+    input_dir: Path = typer.Argument(
+        ..., exists=True, file_okay=False, readable=True, help="Directorio de entrada"
+    ),
+    output_dir: Path = typer.Option(
+        ..., "--output-dir", "-o", help="Directorio de salida; se replica la estructura"
+    ),
+    include: Optional[List[str]] = typer.Option(
+        None,
+        "--include",
+        "-i",
+        help="Patrón glob de archivos a procesar (repetible; por defecto, imágenes comunes)",
+    ),
+    exclude: Optional[List[str]] = typer.Option(
+        None,
+        "--exclude",
+        "-x",
+        help="Patrón glob de archivos o directorios a ignorar (repetible)",
+    ),
+    jobs: Optional[int] = typer.Option(
+        None, "--jobs", "-j", min=1, help="Procesos en paralelo (por defecto, uno por CPU)"
+    ),
+    on_collision: str = typer.Option(
+        "rename",
+        "--on-collision",
+        help="Si la salida ya existe: rename (nombre-2.jpg), overwrite o skip",
+    ),
+    profile: str = typer.Option(
+        "balanced", "--profile", "-p", help="Perfil del codificador: fast, balanced o smallest"
+    ),
+    output_format: str = typer.Option(
+        "JPEG",
+        "--format",
+        "-f",
+        help="Formato de salida: JPEG, PNG, WEBP, TIFF o 'keep' para conservar el original",
+    ),
+    max_dimension: Optional[int] = typer.Option(
+        None,
+        "--max-dimension",
+        min=1,
+        help="Lado máximo en píxeles; las imágenes grandes se decodifican ya reducidas",
+    ),
+    memory_budget: Optional[int] = typer.Option(
+        None,
+        "--memory-budget",
+        min=1,
+        help="Memoria máxima (MiB) por proceso para decodificar; las que no caben fallan",
+    ),
+    downscale_to_budget: bool = typer.Option(
+        False,
+        "--downscale-to-budget",
+        help="Reducir las imágenes que no caben en --memory-budget en lugar de rechazarlas",
+    ),
+    cache_dir: Optional[Path] = typer.Option(
+        None,
+        "--cache-dir",
+        help="Caché de resultados: reutiliza la salida si la imagen ya se limpió antes",
+    ),
+    manifest_path: Optional[Path] = typer.Option(
+        None,
+        "--manifest",
+        help=f"Registro de lo ya procesado (por defecto, {MANIFEST_NAME} en la salida)",
+    ),
+    resume: bool = typer.Option(
+        True,
+        "--resume/--no-resume",
+        help="Omitir las imágenes sin cambios y reanudar las ejecuciones interrumpidas",
+    ),
+) -> None:
+    """Scrub every image under a directory tree across several worker processes.
+
+    Re-runs skip the inputs that did not change since the last one (same size, mtime
+    and settings, output still there) and resume interrupted runs.
+    """
+    import multiprocessing
+    import time
+
+    from rich.progress import (
+        BarColumn,
+        MofNCompleteColumn,
+        Progress,
+        TextColumn,
+        TimeElapsedColumn,
+        TimeRemainingColumn,
+    )
+    from rich.table import Table
+
+    from image_scrubber_core.batch.manifest import RunManifest
+    from image_scrubber_core.batch.pipeline import COLLISION_POLICIES, ScrubPipeline
+    from image_scrubber_core.cache.result_cache import ScrubCache
+
+    if on_collision not in COLLISION_POLICIES:
+        console().print(
+            f"[red]Error:[/red] --on-collision debe ser uno de: {', '.join(COLLISION_POLICIES)}"
+        )
+        raise typer.Exit(code=2)
+    try:
+        options = _scrub_options(
+            profile, output_format, max_dimension, memory_budget, downscale_to_budget
+        )
+    except ValueError as exc:
+        console().print(f"[red]Error:[/red] {exc}")
+        raise typer.Exit(code=2)
+
+    with console().status("Buscando imágenes..."):
+        found = list(_walk(input_dir, include or DEFAULT_INCLUDE, exclude or [], output_dir))
+    if not found:
+        console().print("No se encontraron imágenes.")
+        return
+
+    sizes = [size for _, size in found]
+    total_bytes = sum(sizes)
+    pipeline = ScrubPipeline(
+        output_dir,
+        max_workers=jobs,
+        options=options,
+        cache=ScrubCache(cache_dir) if cache_dir else None,
+        on_collision=on_collision,
+        manifest=RunManifest(manifest_path or output_dir / MANIFEST_NAME) if resume else None,
+        # The pool starts inside the Progress display, whose refresh thread is running
+        # by then: forking with it alive can deadlock the workers
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+    # Outputs mirror the input tree: "a/b/IMG 1.jpg" is proposed as "a/b/IMG 1"
+    sources = (("/".join(rel.parent.parts + (rel.stem,)), input_dir / rel) for rel, _ in found)
+
+    done = scrubbed = had_meta = unchanged = skipped = 0
+    done_bytes = out_bytes = 0
+    errors: List[Tuple[str, str]] = []
+    progress = Progress(
+        TextColumn("[bold cyan]Limpiando"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TextColumn("{task.fields[rate]}"),
+        TimeElapsedColumn(),
+        TextColumn("ETA"),
+        TimeRemainingColumn(),
+        console=console(),
+    )
+    start = time.perf_counter()
+    try:
+        with progress:
+            task = progress.add_task("scrub", total=len(found), rate="")
+            for outcome in pipeline.run(sources):
+                done += 1
+                done_bytes += sizes[outcome.index]
+                if outcome.skipped:
+                    # Skipped by the manifest they carry their recorded output hash
+                    if outcome.sha256 is not None:
+                        unchanged += 1
+                    else:
+                        skipped += 1
+                elif not outcome.ok:
+                    errors.append((outcome.source, outcome.error or ""))
+                else:
+                    scrubbed += 1
+                    had_meta += outcome.had_metadata
+                    if outcome.output_path is not None:
+                        out_bytes += outcome.output_path.stat().st_size
+                elapsed = max(time.perf_counter() - start, 1e-9)
+                rate = f"{done / elapsed:.1f} img/s {done_bytes / elapsed / 1e6:.1f} MB/s"
+                progress.update(task, advance=1, rate=rate)
+    except KeyboardInterrupt:
+        console().print(f"Interrumpido tras {done} imágenes.")
+        if resume:
+            console().print("Vuelve a ejecutar el mismo comando para continuar.")
+        raise typer.Exit(code=130)
+    elapsed = time.perf_counter() - start
+
+    table = Table(title="Resultado del Scrub", show_header=True, header_style="bold cyan")
+    table.add_column("Campo")
+    table.add_column("Valor", justify="right")
+    table.add_row("Imágenes encontradas", str(len(found)))
+    table.add_row("Limpiadas", str(scrubbed))
+    table.add_row("Con metadatos eliminados", str(had_meta))
+    table.add_row("Sin cambios desde la última ejecución", str(unchanged))
+    table.add_row("Omitidas (ya existían)", str(skipped))
+    table.add_row("Errores", f"[red]{len(errors)}[/red]" if errors else "0")
+    table.add_row("Entrada", f"{total_bytes / 1e6:.1f} MB")
+    table.add_row("Salida", f"{out_bytes / 1e6:.1f} MB")
+    table.add_row("Tiempo", f"{elapsed:.1f} s")
+    table.add_row(
+        "Rendimiento", f"{len(found) / elapsed:.1f} img/s, {total_bytes / elapsed / 1e6:.1f} MB/s"
+    )
+    console().print(table)
+
+    if errors:
+        failed = Table(title="Errores", show_header=True, header_style="bold red")
+        failed.add_column("Input", overflow="fold")
+        failed.add_column("Error", overflow="fold")
+        for source, error in errors[:50]:
+            failed.add_row(source, error)
+        console().print(failed)
+        if len(errors) > 50:
+            console().print(f"... y {len(errors) - 50} errores más")
+        raise typer.Exit(code=1)
+
+
+def _scrub_options(
+    profile: str,
+    output_format: str,
+    max_dimension: Optional[int],
+    memory_budget: Optional[int],
+    downscale_to_budget: bool,
+) -> ScrubOptions:
+    from image_scrubber_core.metadata.scrubber import ScrubOptions
+
+    return ScrubOptions(
+        profile=profile,
+        output_format=None if output_format.lower() == "keep" else output_format,
+        max_dimension=max_dimension,
+        memory_budget=memory_budget << 20 if memory_budget else None,
+        downscale_to_budget=downscale_to_budget,
+    )
+
+
+def _walk(
+    root: Path, include: List[str], exclude: List[str], output_dir: Path
+) -> Iterator[Tuple[Path, int]]:
+    """Yield ``(path relative to root, size)`` for every file matching the globs.
+
+    Patterns are matched case-insensitively against both the file name and the
+    relative path, so ``*.jpg`` and ``raw/*`` both work. Excluded directories and
+    the output directory (when it lies inside ``root``) are not descended into.
+    """
+    import os
+    from fnmatch import fnmatch
+
+    include = [p.lower() for p in include]
+    exclude = [p.lower() for p in exclude]
+    output_dir = output_dir.resolve()
+
+    def matches(rel: str, patterns: List[str]) -> bool:
+        name = rel.rsplit("/", 1)[-1]
+        return any(fnmatch(name, p) or fnmatch(rel, p) for p in patterns)
+
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda e: e.name)
+        except OSError:
+            continue
+        for entry in entries:
+            rel = Path(entry.path).relative_to(root)
+            key = rel.as_posix().lower()
+            if entry.is_dir(follow_symlinks=False):
+                if not matches(key, exclude) and Path(entry.path).resolve() != output_dir:
+                    stack.append(Path(entry.path))
+            elif entry.is_file() and matches(key, include) and not matches(key, exclude):
+                yield rel, entry.stat().st_size
+
+
+def _enable_stage_logging() -> None:
+    import logging
+    import sys
+
+    from image_scrubber_core.instrumentation import LoggingObserver, add_observer
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(
+        logging.Formatter("ts=%(asctime)s level=%(levelname)s %(message)s", "%Y-%m-%dT%H:%M:%S")
+    )
+    logger = logging.getLogger("image_scrubber_core.stages")
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    add_observer(LoggingObserver(logger))
+
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
@@ -0,0 +1,269 @@
+"""Benchmarks for the image_scrubber_core hot path.
+
+Generates a synthetic corpus locally (deterministic, cached under ``.corpus/``), times
+every stage of the pipeline on it and records peak memory. Each case runs in a fresh
+process so memory numbers are not polluted by earlier cases.
+
+    python benchmarks/bench_core.py                  # run and compare with the baseline
+    python benchmarks/bench_core.py --save-baseline  # record a new baseline
+    python benchmarks/bench_core.py --quick          # skip the huge images
+
+A run fails (exit code 1) when any case is slower or uses more memory than the stored
+baseline by more than ``--tolerance``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import io
+import json
+import multiprocessing
+import platform
+import resource
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+HERE = Path(__file__).resolve().parent
+CORPUS_DIR = HERE / ".corpus"
+BASELINE_PATH = HERE / "baseline.json"
+
+# name -> (width, height, format, variant)
+CORPUS: Dict[str, tuple[int, int, str, str]] = {
+    "small_exif.jpg": (640, 480, "JPEG", "exif"),
+    "small_clean.jpg": (640, 480, "JPEG", "clean"),
+    "medium_exif.jpg": (2000, 1500, "JPEG", "exif"),
+    "medium_clean.jpg": (2000, 1500, "JPEG", "clean"),
+    "huge_exif.jpg": (8000, 6000, "JPEG", "exif"),
+    "medium_alpha.png": (2000, 1500, "PNG", "alpha"),
+    "medium_16bit.tiff": (2000, 1500, "TIFF", "16bit"),
+}
+HUGE = {"huge_exif.jpg"}
+
+STAGES = ("inspect", "decode", "encode", "scrub", "hash")
+
+# Memory is noisy at the low end; differences below this never count as regressions
+MEMORY_SLACK_KB = 8 * 1024
+
+
+def _photo_like(width: int, height: int) -> Any:
+    """Smooth colour fields plus fine grain, so encoders see realistic content."""
+    from PIL import Image
+
+    channels = [
+        Image.effect_noise((max(1, width // 32), max(1, height // 32)), 64).resize(
+            (width, height), Image.Resampling.BICUBIC
+        )
+        for _ in range(3)
+    ]
+    img = Image.merge("RGB", channels)
+    grain_tile = Image.merge("RGB", [Image.effect_noise((256, 256), 12)] * 3)
+    grain = Image.new("RGB", (width, height))
+    for x in range(0, width, 256):
+        for y in range(0, height, 256):
+            grain.paste(grain_tile, (x, y))
+    return Image.blend(img, grain, 0.2)
+
+
+def build_corpus(names: List[str]) -> None:
+    import piexif
+    from PIL import Image
+
+    CORPUS_DIR.mkdir(exist_ok=True)
+    exif = piexif.dump(
+        {
+            "0th": {piexif.ImageIFD.Make: b"Bench", piexif.ImageIFD.Model: b"Cam 1"},
+            "GPS": {piexif.GPSIFD.GPSLatitudeRef: b"N"},
+        }
+    )
+    for name in names:
+        path = CORPUS_DIR / name
+        if path.exists():
+            continue
+        width, height, fmt, variant = CORPUS[name]
+        img = _photo_like(width, height)
+        if variant == "alpha":
+            img = img.convert("RGBA")
+            img.putalpha(Image.linear_gradient("L").resize((width, height)))
+            img.save(path, fmt, compress_level=6)
+        elif variant == "16bit":
+            gray = img.convert("L").convert("I").point(lambda v: v * 257).convert("I;16")
+            gray.save(path, fmt)
+        elif variant == "exif":
+            img.save(path, fmt, quality=92, exif=exif)
+        else:
+            img.save(path, fmt, quality=92)
+
+
+@dataclass
+class CaseResult:
+    case: str
+    median_ms: float
+    min_ms: float
+    runs: int
+    mp_per_s: float
+    mb_per_s: float
+    peak_rss_delta_kb: int
+
+
+def _time(fn: Callable[[], Any], budget_s: float) -> List[float]:
+    fn()  # warm-up
+    samples: List[float] = []
+    start = time.perf_counter()
+    while len(samples) < 3 or (time.perf_counter() - start < budget_s and len(samples) < 50):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def run_case(name: str, stage: str, budget_s: float) -> CaseResult:
+    """Run one (file, stage) case; executed in its own process."""
+    from image_scrubber_core import (
+        FileHasher,
+        ImageScrubber,
+        MetadataCleaner,
+        MetadataInspector,
+        MetadataWriter,
+    )
+
+    path = CORPUS_DIR / name
+    width, height, _, _ = CORPUS[name]
+    size = path.stat().st_size
+
+    fn: Callable[[], Any]
+    if stage == "inspect":
+        fn = lambda: MetadataInspector.inspect(path)  # noqa: E731
+    elif stage == "decode":
+        fn = lambda: MetadataCleaner.clean(path)[0].load()  # noqa: E731
+    elif stage == "encode":
+        img, _ = MetadataCleaner.clean(path)
+        img.load()
+        fn = lambda: MetadataWriter.add_generic_and_save(img, io.BytesIO())  # noqa: E731
+    elif stage == "scrub":
+        fn = lambda: ImageScrubber.scrub(path, io.BytesIO())  # noqa: E731
+    elif stage == "hash":
+        fn = lambda: FileHasher.sha256(path)  # noqa: E731
+    else:
+        raise ValueError(f"Unknown stage {stage!r}")
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    samples = _time(fn, budget_s)
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    median = statistics.median(samples)
+    return CaseResult(
+        case=f"{stage}:{name}",
+        median_ms=median * 1000,
+        min_ms=min(samples) * 1000,
+        runs=len(samples),
+        mp_per_s=width * height / 1e6 / median,
+        mb_per_s=size / 1e6 / median,
+        peak_rss_delta_kb=max(0, rss_after - rss_before),
+    )
+
+
+def run_sanitize(budget_s: float) -> CaseResult:
+    from image_scrubber_core import FilenameSanitizer
+
+    names = [f"Foto de Vacaciones {i} ÁÉÍ_final (copia).JPG" for i in range(1000)]
+    samples = _time(lambda: [FilenameSanitizer.sanitize(n) for n in names], budget_s)
+    median = statistics.median(samples)
+    return CaseResult(
+        case="sanitize:1000-names",
+        median_ms=median * 1000,
+        min_ms=min(samples) * 1000,
+        runs=len(samples),
+        mp_per_s=0.0,
+        mb_per_s=0.0,
+        peak_rss_delta_kb=0,
+    )
+
+
+def _isolated(fn: Callable[..., CaseResult], *args: Any) -> CaseResult:
+    """Run ``fn`` in a brand-new interpreter so its peak RSS is its own."""
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(fn, *args).result()
+
+
+def compare(results: List[CaseResult], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    for r in results:
+        base = baseline.get(r.case)
+        if base is None:
+            continue
+        if r.median_ms > base["median_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{r.case}: {r.median_ms:.2f} ms vs baseline {base['median_ms']:.2f} ms"
+            )
+        mem_limit = base["peak_rss_delta_kb"] * (1 + tolerance) + MEMORY_SLACK_KB
+        if r.peak_rss_delta_kb > mem_limit:
+            regressions.append(
+                f"{r.case}: peak +{r.peak_rss_delta_kb} KiB vs baseline "
+                f"+{base['peak_rss_delta_kb']} KiB"
+            )
+    return regressions
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--quick", action="store_true", help="skip the huge images")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown (0.25)")
+    parser.add_argument("--budget", type=float, default=1.0, help="seconds per case")
+    parser.add_argument("--stage", action="append", choices=STAGES, help="only these stages")
+    parser.add_argument("--json", type=Path, help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    names = [n for n in CORPUS if not (args.quick and n in HUGE)]
+    build_corpus(names)
+    stages = args.stage or list(STAGES)
+
+    results: List[CaseResult] = []
+    for name in names:
+        for stage in stages:
+            results.append(_isolated(run_case, name, stage, args.budget))
+    results.append(_isolated(run_sanitize, args.budget))
+
+    print(f"{'case':40} {'median ms':>10} {'MP/s':>8} {'MB/s':>8} {'peak KiB':>10}")
+    for r in results:
+        print(
+            f"{r.case:40} {r.median_ms:10.2f} {r.mp_per_s:8.1f} {r.mb_per_s:8.1f} "
+            f"{r.peak_rss_delta_kb:10d}"
+        )
+
+    payload = {
+        "machine": {"platform": platform.platform(), "python": sys.version.split()[0]},
+        "results": {r.case: asdict(r) for r in results},
+    }
+    if args.json:
+        args.json.write_text(json.dumps(payload, indent=2))
+
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(payload, indent=2))
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not args.baseline.is_file():
+        print("No baseline yet; run with --save-baseline to record one.")
+        return 0
+
+    baseline = json.loads(args.baseline.read_text())
+    regressions = compare(results, baseline["results"], args.tolerance)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        return 1
+    print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""Cold-start budget for the core and the CLI.
+
+Each statement runs in a fresh interpreter; the best of ``--runs`` wall times, minus
+an empty interpreter start, must stay within its budget, and none of the heavy
+modules listed for it may have been imported.
+
+    python benchmarks/bench_import.py              # exits 1 when a budget is blown
+    python benchmarks/bench_import.py --scale 2    # slower machine: double budgets
+
+Unlike ``bench_core.py`` the budgets are absolute, so this also fits in CI.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Tuple
+
+HERE = Path(__file__).resolve().parent
+REPO = HERE.parents[2]
+PYTHONPATH = [
+    HERE.parent,
+    REPO / "apps" / "image_scruber_cli" / "src",
+]
+
+
+@dataclass(frozen=True)
+class ImportCase:
+    statement: str
+    budget_ms: float
+    # Modules that must stay unimported after ``statement``
+    forbidden: Tuple[str, ...]
+    # Skip the case when this module is not installed
+    requires: str | None = None
+
+
+CASES = [
+    ImportCase(
+        "import image_scrubber_core",
+        20,
+        ("PIL", "piexif", "sqlite3", "concurrent.futures"),
+    ),
+    ImportCase(
+        "from image_scrubber_core import FileHasher, FilenameSanitizer",
+        60,
+        ("PIL", "piexif", "sqlite3", "concurrent.futures"),
+    ),
+    ImportCase(
+        "import image_scrubber_cli.main",
+        120,
+        ("PIL", "piexif", "rich", "image_scrubber_core.metadata"),
+        requires="typer",
+    ),
+]
+
+
+def _env() -> dict[str, str]:
+    env = dict(os.environ)
+    paths = [str(p) for p in PYTHONPATH]
+    if env.get("PYTHONPATH"):
+        paths.append(env["PYTHONPATH"])
+    env["PYTHONPATH"] = os.pathsep.join(paths)
+    return env
+
+
+def _best_wall_ms(code: str, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, env=_env())
+        best = min(best, (time.perf_counter() - t0) * 1000)
+    return best
+
+
+def _leaked(case: ImportCase) -> List[str]:
+    probe = (
+        f"{case.statement}\n"
+        "import json, sys\n"
+        f"print(json.dumps([m for m in {list(case.forbidden)!r} if m in sys.modules]))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", probe], check=True, env=_env(), capture_output=True, text=True
+    )
+    leaked: List[str] = json.loads(out.stdout)
+    return leaked
+
+
+def _installed(module: str) -> bool:
+    probe = f"import importlib.util, sys; sys.exit(importlib.util.find_spec({module!r}) is None)"
+    return subprocess.run([sys.executable, "-c", probe], env=_env()).returncode == 0
+
+
+def main(argv: List[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget")
+    args = parser.parse_args(argv)
+
+    startup = _best_wall_ms("pass", args.runs)
+    print(f"interpreter start: {startup:.1f} ms\n")
+    print(f"{'statement':62} {'ms':>7} {'budget':>7}")
+
+    failures: List[str] = []
+    for case in CASES:
+        if case.requires and not _installed(case.requires):
+            print(f"{case.statement:62} skipped ({case.requires} not installed)")
+            continue
+        cost = _best_wall_ms(case.statement, args.runs) - startup
+        budget = case.budget_ms * args.scale
+        print(f"{case.statement:62} {cost:7.1f} {budget:7.1f}")
+        if cost > budget:
+            failures.append(f"{case.statement}: {cost:.1f} ms over the {budget:.0f} ms budget")
+        leaked = _leaked(case)
+        if leaked:
+            failures.append(f"{case.statement}: imports {', '.join(leaked)} eagerly")
+
+    if failures:
+        print("\nFailures:")
+        for line in failures:
+            print(f"  {line}")
+        return 1
+    print("\nAll imports within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
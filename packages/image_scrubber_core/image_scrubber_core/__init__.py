@@ -1,11 +1,100 @@
-from .metadata.cleaner import MetadataCleaner
-from .metadata.writer import MetadataWriter
-from .filenames.sanitizer import FilenameSanitizer
-from .security.hashing import FileHasher
+"""Public API of image_scrubber_core.
 
-__all__ = [
+Names are resolved lazily on first access, so ``import image_scrubber_core`` does
+not pull in Pillow or piexif until something that needs them is used.
+"""
+
+from __future__ import annotations
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .batch.manifest import RunManifest
+    from .batch.pipeline import ScrubOutcome, ScrubPipeline
+    from .cache.result_cache import ScrubCache
+    from .exceptions import ImageScrubberError, MemoryBudgetExceeded
+    from .filenames.sanitizer import FilenameAllocator, FilenameSanitizer
+    from .instrumentation import (
+        LoggingObserver,
+        ScrubObserver,
+        StageEvent,
+        add_observer,
+        remove_observer,
+    )
+    from .metadata.bounded import BoundedDecoder
+    from .metadata.cleaner import MetadataCleaner
+    from .metadata.inspector import MetadataInspector, MetadataReport
+    from .metadata.profiles import ENCODER_PROFILES, EncoderProfile
+    from .metadata.scrubber import ImageScrubber, ScrubOptions
+    from .metadata.writer import MetadataWriter
+    from .security.hashing import FileHasher, HashResult
+
+# Public name -> module that defines it
+_EXPORTS = {
+    "ImageScrubberError": ".exceptions",
+    "MemoryBudgetExceeded": ".exceptions",
+    "BoundedDecoder": ".metadata.bounded",
+    "StageEvent": ".instrumentation",
+    "ScrubObserver": ".instrumentation",
+    "LoggingObserver": ".instrumentation",
+    "add_observer": ".instrumentation",
+    "remove_observer": ".instrumentation",
+    "MetadataCleaner": ".metadata.cleaner",
+    "MetadataWriter": ".metadata.writer",
+    "MetadataInspector": ".metadata.inspector",
+    "MetadataReport": ".metadata.inspector",
+    "EncoderProfile": ".metadata.profiles",
+    "ENCODER_PROFILES": ".metadata.profiles",
+    "ImageScrubber": ".metadata.scrubber",
+    "ScrubOptions": ".metadata.scrubber",
+    "ScrubPipeline": ".batch.pipeline",
+    "ScrubOutcome": ".batch.pipeline",
+    "RunManifest": ".batch.manifest",
+    "ScrubCache": ".cache.result_cache",
+    "FilenameSanitizer": ".filenames.sanitizer",
+    "FilenameAllocator": ".filenames.sanitizer",
+    "FileHasher": ".security.hashing",
+    "HashResult": ".security.hashing",
+}
+
+__all__ = (
+    "ENCODER_PROFILES",
+    "BoundedDecoder",
+    "EncoderProfile",
+    "FileHasher",
+    "FilenameAllocator",
+    "FilenameSanitizer",
+    "HashResult",
+    "ImageScrubber",
+    "ImageScrubberError",
+    "LoggingObserver",
+    "MemoryBudgetExceeded",
     "MetadataCleaner",
+    "MetadataInspector",
+    "MetadataReport",
     "MetadataWriter",
-    "FilenameSanitizer",
-    "FileHasher",
-]
\ No newline at end of file
+    "RunManifest",
+    "ScrubCache",
+    "ScrubObserver",
+    "ScrubOptions",
+    "ScrubOutcome",
+    "ScrubPipeline",
+    "StageEvent",
+    "add_observer",
+    "remove_observer",
+)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    # Cache it so later lookups skip __getattr__ entirely
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
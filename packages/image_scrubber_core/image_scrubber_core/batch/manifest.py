@@ -0,0 +1,181 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, List
+
+from ..metadata.scrubber import ScrubOptions
+
+# output_sha256 is NULL from the moment an item is submitted until its output is
+# written, so a run that is killed leaves those items pending and the next run
+# scrubs them again into the same file.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    input TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    input_sha256 BLOB,
+    output TEXT NOT NULL,
+    output_sha256 BLOB,
+    output_size INTEGER,
+    had_metadata INTEGER NOT NULL DEFAULT 0,
+    settings TEXT NOT NULL,
+    updated REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS entries_output ON entries (output);
+"""
+
+
+@dataclass(frozen=True)
+class ManifestEntry:
+    """What the manifest knows about one input."""
+
+    input: str
+    size: int
+    mtime_ns: int
+    input_sha256: str | None
+    output: Path
+    output_sha256: str | None
+    output_size: int | None
+    had_metadata: bool
+    settings: str
+
+    @property
+    def done(self) -> bool:
+        return self.output_sha256 is not None
+
+
+class RunManifest:
+    """Record of every input a batch run scrubbed, kept in SQLite.
+
+    Each input is stored with the size and mtime it had, its digest, the output it
+    was written to and that output's sha256. An input whose size, mtime and scrub
+    settings still match, and whose output is still there with the recorded size,
+    is unchanged and can be skipped with nothing but ``stat`` calls.
+
+    Items are marked pending when submitted and done when their output is written,
+    one small transaction each, so an interrupted run resumes where it stopped.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """SQLite connection for the calling thread."""
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # Two commits per item: without an fsync each, a crash loses at most the
+            # last few, which are redone
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def key(path: str | Path) -> str:
+        return str(Path(path).absolute())
+
+    @staticmethod
+    def settings_key(options: ScrubOptions, **extra: Any) -> str:
+        """Fingerprint of the settings an output was produced with."""
+        payload = json.dumps({**asdict(options), **extra}, sort_keys=True, default=repr)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def get(self, path: str | Path) -> ManifestEntry | None:
+        row = self.db.execute(
+            "SELECT * FROM entries WHERE input = ?", (self.key(path),)
+        ).fetchone()
+        if row is None:
+            return None
+        key, size, mtime_ns, input_sha, output, output_sha, output_size, had_meta, settings, _ = row
+        return ManifestEntry(
+            input=key,
+            size=size,
+            mtime_ns=mtime_ns,
+            input_sha256=input_sha.hex() if input_sha else None,
+            output=Path(output),
+            output_sha256=output_sha.hex() if output_sha else None,
+            output_size=output_size,
+            had_metadata=bool(had_meta),
+            settings=settings,
+        )
+
+    @staticmethod
+    def is_current(entry: ManifestEntry, st: os.stat_result, settings: str) -> bool:
+        """Whether ``entry`` still describes an input with stat ``st``."""
+        if not entry.done or entry.settings != settings:
+            return False
+        if (entry.size, entry.mtime_ns) != (st.st_size, st.st_mtime_ns):
+            return False
+        try:
+            return entry.output.stat().st_size == entry.output_size
+        except OSError:
+            return False
+
+    def begin(self, path: str | Path, st: os.stat_result, output: Path, settings: str) -> None:
+        """Mark ``path`` as being scrubbed into ``output``."""
+        with self.db:
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries"
+                " (input, size, mtime_ns, output, settings, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    self.key(path),
+                    st.st_size,
+                    st.st_mtime_ns,
+                    str(output.absolute()),
+                    settings,
+                    time.time(),
+                ),
+            )
+
+    def complete(
+        self,
+        path: str | Path,
+        input_sha256: str | None,
+        output_sha256: str,
+        had_metadata: bool,
+    ) -> None:
+        """Record the output written for a pending ``path``."""
+        key = self.key(path)
+        (output,) = self.db.execute(
+            "SELECT output FROM entries WHERE input = ?", (key,)
+        ).fetchone()
+        with self.db:
+            self.db.execute(
+                "UPDATE entries SET input_sha256 = ?, output_sha256 = ?, output_size = ?,"
+                " had_metadata = ?, updated = ? WHERE input = ?",
+                (
+                    bytes.fromhex(input_sha256) if input_sha256 else None,
+                    bytes.fromhex(output_sha256),
+                    Path(output).stat().st_size,
+                    int(had_metadata),
+                    time.time(),
+                    key,
+                ),
+            )
+
+    def outputs_in(self, directory: Path) -> List[str]:
+        """Names of the recorded outputs that live directly in ``directory``."""
+        # Outputs are absolute paths: everything under the directory sorts between
+        # "<directory>/" and "<directory>0" (the character after the separator)
+        base = str(directory.absolute())
+        rows = self.db.execute(
+            "SELECT output FROM entries WHERE output >= ? AND output < ?",
+            (base + os.sep, base + chr(ord(os.sep) + 1)),
+        )
+        return [Path(output).name for (output,) in rows if Path(output).parent == Path(base)]
+
+    def forget(self, path: str | Path) -> None:
+        with self.db:
+            self.db.execute("DELETE FROM entries WHERE input = ?", (self.key(path),))
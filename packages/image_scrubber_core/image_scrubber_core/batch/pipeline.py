@@ -0,0 +1,295 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, replace
+from multiprocessing.context import BaseContext
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Tuple
+
+from ..cache.result_cache import ScrubCache
+from ..filenames.sanitizer import FilenameAllocator
+from ..metadata.scrubber import DEFAULT_OPTIONS, ImageScrubber, ScrubOptions
+from ..security.hashing import FileHasher
+from .manifest import ManifestEntry, RunManifest
+
+# A source is a path, or a ``(proposed_name, path_or_bytes)`` pair when the output
+# name should not be derived from the input path (or there is no path at all). A
+# proposed name may start with a relative directory ("2019/viaje/IMG 001"); the
+# output is then written to that subdirectory of ``output_dir``.
+ScrubSource = str | Path | Tuple[str, str | Path | bytes | bytearray | memoryview]
+
+# What to do when an output name is already taken by a file in the output directory:
+# pick the next free ``name-2.jpg`` suffix, replace the file, or leave it and skip the
+# item. Items of the same batch never overwrite each other whatever the policy.
+COLLISION_POLICIES = ("rename", "overwrite", "skip")
+
+
+@dataclass(frozen=True)
+class ScrubOutcome:
+    """Result of scrubbing one item of a batch."""
+
+    index: int
+    source: str
+    output_path: Path | None = None
+    had_metadata: bool = False
+    sha256: str | None = None
+    error: str | None = None
+    skipped: bool = False
+    input_sha256: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def _scrub_one(
+    index: int,
+    label: str,
+    data: Path | bytes,
+    output_path: Path,
+    options: ScrubOptions,
+    cache: ScrubCache | None,
+    hash_input: bool = False,
+    expected_sha256: str | None = None,
+) -> ScrubOutcome:
+    try:
+        input_sha = FileHasher.sha256(data) if hash_input else None
+        if input_sha is not None and input_sha == expected_sha256:
+            # Touched or copied since the last run, but the content is the same
+            return ScrubOutcome(
+                index=index,
+                source=label,
+                output_path=output_path,
+                skipped=True,
+                input_sha256=input_sha,
+            )
+        had_meta, sha = ImageScrubber.scrub(data, output_path, options, cache, input_sha)
+    except Exception as exc:
+        return ScrubOutcome(index=index, source=label, error=f"{type(exc).__name__}: {exc}")
+    return ScrubOutcome(
+        index=index,
+        source=label,
+        output_path=output_path,
+        had_metadata=had_meta,
+        sha256=sha,
+        input_sha256=input_sha,
+    )
+
+
+class ScrubPipeline:
+    """Scrub many images across a process pool, yielding results as they complete.
+
+    At most ``max_in_flight`` items are submitted at any time, so the input iterable
+    is consumed lazily and memory stays flat however large the batch is. A failing
+    item is reported through ``ScrubOutcome.error`` and never aborts the batch.
+
+    ``on_collision`` is one of ``COLLISION_POLICIES``; with ``skip`` an item whose
+    output already exists comes back with ``skipped=True`` and is not scrubbed.
+
+    With a ``manifest``, path inputs that are unchanged since they were recorded come
+    back skipped as well, carrying their recorded output. Changed and unfinished
+    ones are scrubbed again into the file they were given before; when only the
+    mtime moved, the worker compares the input digest first and skips on a match.
+    Recorded outputs are never handed to another input, whatever ``on_collision``.
+
+    ``mp_context`` is handed to the process pool; callers that have threads running
+    when ``run`` starts (a progress display, a server) should pass a ``spawn`` one,
+    as forking a threaded process can deadlock the workers.
+    """
+
+    def __init__(
+        self,
+        output_dir: str | Path,
+        max_workers: int | None = None,
+        max_in_flight: int | None = None,
+        options: ScrubOptions = DEFAULT_OPTIONS,
+        cache: ScrubCache | None = None,
+        on_collision: str = "rename",
+        manifest: RunManifest | None = None,
+        mp_context: BaseContext | None = None,
+    ) -> None:
+        if on_collision not in COLLISION_POLICIES:
+            raise ValueError(f"Unknown collision policy: {on_collision!r}")
+        # Absolute, so outputs recorded in a manifest match the allocator directories
+        self.output_dir = Path(output_dir).absolute()
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_in_flight = max_in_flight or self.max_workers * 2
+        self.options = options
+        self.cache = cache
+        self.on_collision = on_collision
+        self.manifest = manifest
+        self.mp_context = mp_context
+        self._settings = RunManifest.settings_key(options) if manifest is not None else ""
+        # One allocator per output (sub)directory, created on first use
+        self._names: Dict[Path, FilenameAllocator] = {}
+
+    def _allocator(self, directory: Path) -> FilenameAllocator:
+        names = self._names.get(directory)
+        if names is None:
+            directory.mkdir(parents=True, exist_ok=True)
+            # Only "rename" has to steer clear of existing files; the other policies
+            # just keep the items of the batch apart and look at the disk per item
+            listed = directory if self.on_collision == "rename" else None
+            names = self._names[directory] = FilenameAllocator(listed)
+            if self.manifest is not None:
+                # Outputs of earlier runs belong to their inputs, skipped or not: a
+                # new input that sanitizes to the same name must not take them
+                for name in self.manifest.outputs_in(directory):
+                    names.take(name)
+        return names
+
+    def _output_path(self, proposed_name: str, data: Path | bytes) -> Path:
+        # Different inputs often sanitize to the same name; never let two items of
+        # the batch (or an item and an earlier output) share a file.
+        subdir, _, stem = proposed_name.rpartition("/")
+        if Path(subdir).is_absolute() or ".." in Path(subdir).parts:
+            raise ValueError(f"Output subdirectory outside output_dir: {subdir!r}")
+        directory = self.output_dir / subdir
+        extension = ImageScrubber.extension_for(data, self.options)
+        return directory / self._allocator(directory).allocate(stem, extension)
+
+    def _resumed_output(self, entry: ManifestEntry | None, data: Path) -> Path | None:
+        # Rewrite the file an earlier run produced for this input, rather than
+        # allocating a new name next to it
+        if (
+            entry is None
+            or not entry.output.is_relative_to(self.output_dir)
+            or entry.output.suffix != ImageScrubber.extension_for(data, self.options)
+            or not entry.output.exists()
+        ):
+            return None
+        self._allocator(entry.output.parent).take(entry.output.name)
+        return entry.output
+
+    def _record(
+        self, path: Path, entry: ManifestEntry | None, outcome: ScrubOutcome
+    ) -> ScrubOutcome:
+        assert self.manifest is not None
+        if outcome.skipped and entry is not None:
+            outcome = replace(
+                outcome, had_metadata=entry.had_metadata, sha256=entry.output_sha256
+            )
+        if outcome.ok and outcome.sha256:
+            try:
+                self.manifest.complete(
+                    path, outcome.input_sha256, outcome.sha256, outcome.had_metadata
+                )
+                return outcome
+            except OSError as exc:
+                # The output vanished before it could be recorded
+                outcome = replace(outcome, error=f"{type(exc).__name__}: {exc}")
+        self.manifest.forget(path)
+        return outcome
+
+    @staticmethod
+    def _unpack(source: ScrubSource) -> Tuple[str, str, Path | bytes]:
+        if isinstance(source, tuple):
+            name, data = source
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                return name, name, bytes(data)
+            return str(data), name, Path(data)
+        p = Path(source)
+        return str(p), p.stem, p
+
+    def run(self, sources: Iterable[ScrubSource]) -> Iterator[ScrubOutcome]:
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._names = {}
+
+        with ProcessPoolExecutor(self.max_workers, mp_context=self.mp_context) as pool:
+            pending: Dict[
+                Future[ScrubOutcome], Tuple[int, str, Path | None, ManifestEntry | None]
+            ] = {}
+            items = enumerate(sources)
+            exhausted = False
+
+            while pending or not exhausted:
+                while not exhausted and len(pending) < self.max_in_flight:
+                    try:
+                        index, source = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    try:
+                        label, name, data = self._unpack(source)
+                    except (TypeError, ValueError) as exc:
+                        yield ScrubOutcome(index=index, source=repr(source)[:200], error=str(exc))
+                        continue
+                    # Only path inputs are recorded in the manifest
+                    recorded: Path | None = None
+                    if self.manifest is not None and isinstance(data, Path):
+                        recorded = data
+                    st = entry = reused = None
+                    try:
+                        if self.manifest is not None and recorded is not None:
+                            st = recorded.stat()
+                            entry = self.manifest.get(recorded)
+                            if entry is not None and self.manifest.is_current(
+                                entry, st, self._settings
+                            ):
+                                yield ScrubOutcome(
+                                    index=index,
+                                    source=label,
+                                    output_path=entry.output,
+                                    had_metadata=entry.had_metadata,
+                                    sha256=entry.output_sha256,
+                                    skipped=True,
+                                    input_sha256=entry.input_sha256,
+                                )
+                                continue
+                            reused = self._resumed_output(entry, recorded)
+                        output_path = reused or self._output_path(name, data)
+                    except (OSError, ValueError) as exc:
+                        yield ScrubOutcome(
+                            index=index, source=label, error=f"{type(exc).__name__}: {exc}"
+                        )
+                        continue
+                    if reused is None and self.on_collision == "skip" and output_path.exists():
+                        # Allocated names are unique within the batch, so the file
+                        # was there before the run
+                        yield ScrubOutcome(
+                            index=index, source=label, output_path=output_path, skipped=True
+                        )
+                        continue
+                    expected = None
+                    if self.manifest is not None and recorded is not None and st is not None:
+                        self.manifest.begin(recorded, st, output_path, self._settings)
+                        if (
+                            reused is not None
+                            and entry is not None
+                            and entry.done
+                            and entry.size == st.st_size
+                            and entry.settings == self._settings
+                            and entry.mtime_ns != st.st_mtime_ns
+                        ):
+                            # Only touched: skipped if the digest did not change
+                            expected = entry.input_sha256
+                    future = pool.submit(
+                        _scrub_one,
+                        index,
+                        label,
+                        data,
+                        output_path,
+                        self.options,
+                        self.cache,
+                        recorded is not None,
+                        expected,
+                    )
+                    pending[future] = (index, label, recorded, entry)
+
+                if not pending:
+                    continue
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, label, recorded, entry = pending.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as exc:
+                        # Worker crashed (e.g. killed by the OOM killer)
+                        outcome = ScrubOutcome(
+                            index=index, source=label, error=f"{type(exc).__name__}: {exc}"
+                        )
+                    if recorded is not None:
+                        outcome = self._record(recorded, entry, outcome)
+                    yield outcome
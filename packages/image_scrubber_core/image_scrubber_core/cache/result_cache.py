@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Tuple
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL,
+    had_metadata INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_access REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access);
+CREATE INDEX IF NOT EXISTS entries_sha256 ON entries (sha256);
+CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT INTO meta
+    SELECT 'bytes', (SELECT COALESCE(SUM(size), 0)
+                     FROM (SELECT DISTINCT sha256, size FROM entries))
+    WHERE NOT EXISTS (SELECT 1 FROM meta WHERE name = 'bytes');
+"""
+
+# Expired entries are looked for at most this often; the size limit is checked on
+# every put
+_EXPIRY_INTERVAL = 60.0
+
+
+def _canonical(value: Any) -> Any:
+    if isinstance(value, bytes):
+        return value.hex()
+    return repr(value)
+
+
+class ScrubCache:
+    """Content-addressed cache of scrub results.
+
+    Entries are keyed by the input digest plus the writer settings, and point at
+    output blobs stored under ``objects/`` by their own sha256 (so identical outputs
+    are stored once). The index is a SQLite database; entries that were not used for
+    ``max_age`` seconds are dropped, then the least recently used ones until the
+    stored outputs fit in ``max_bytes``. The total size of the stored outputs is kept
+    up to date in a ``meta`` row, so checking the limit after a ``put`` costs O(1).
+    """
+
+    def __init__(
+        self,
+        directory: str | Path,
+        max_bytes: int = 1 << 30,
+        max_age: float = 7 * 24 * 3600,
+    ) -> None:
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._objects = self.directory / "objects"
+        self._objects.mkdir(parents=True, exist_ok=True)
+        self._last_expiry = 0.0
+        self._local = threading.local()
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Connections cannot cross process boundaries; workers reconnect lazily
+        state = self.__dict__.copy()
+        del state["_local"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        """SQLite connection for the calling thread."""
+        conn: sqlite3.Connection | None = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.directory / "index.sqlite3", timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def make_key(input_sha256: str, **settings: Any) -> str:
+        """Derive the cache key for ``input_sha256`` scrubbed with ``settings``."""
+        payload = json.dumps(settings, sort_keys=True, default=_canonical)
+        return hashlib.sha256(f"{input_sha256}\x00{payload}".encode()).hexdigest()
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self._objects / sha256[:2] / sha256
+
+    def get(self, key: str) -> Tuple[Path, bool, str] | None:
+        """Return ``(blob_path, had_metadata, sha256)`` for ``key``, or ``None``."""
+        row = self.db.execute(
+            "SELECT sha256, had_metadata FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        sha, had_meta = row
+        blob = self._blob_path(sha)
+        with self.db:
+            if not blob.is_file():
+                self._delete(key, sha)
+                return None
+            self.db.execute(
+                "UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+        return blob, bool(had_meta), sha
+
+    def put(self, key: str, data: bytes, had_metadata: bool, sha256: str) -> None:
+        blob = self._blob_path(sha256)
+        if not blob.is_file():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            tmp = blob.with_name(f".{blob.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            tmp.write_bytes(data)
+            os.replace(tmp, blob)
+
+        now = time.time()
+        with self.db:
+            old = self.db.execute("SELECT sha256 FROM entries WHERE key = ?", (key,)).fetchone()
+            if old is not None:
+                self._delete(key, old[0])
+            if not self._referenced(sha256):
+                self._add_bytes(len(data))
+            self.db.execute(
+                "INSERT INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                (key, sha256, int(had_metadata), len(data), now, now),
+            )
+        if old is not None and old[0] != sha256 and not self._referenced(old[0]):
+            self._blob_path(old[0]).unlink(missing_ok=True)
+        if self.total_bytes() > self.max_bytes or now - self._last_expiry > _EXPIRY_INTERVAL:
+            self.evict(now)
+
+    def total_bytes(self) -> int:
+        """Size of the stored outputs (each distinct blob counted once)."""
+        (total,) = self.db.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()
+        return int(total)
+
+    def _add_bytes(self, delta: int) -> None:
+        self.db.execute("UPDATE meta SET value = value + ? WHERE name = 'bytes'", (delta,))
+
+    def _delete(self, key: str, sha256: str) -> None:
+        # Blobs are shared between entries: their size only leaves the total together
+        # with the last entry that points at them
+        row = self.db.execute(
+            "DELETE FROM entries WHERE key = ? RETURNING size", (key,)
+        ).fetchone()
+        if row is not None and not self._referenced(sha256):
+            self._add_bytes(-row[0])
+
+    def evict(self, now: float | None = None) -> int:
+        """Apply the age and size limits; return how many entries were removed."""
+        now = time.time() if now is None else now
+        self._last_expiry = now
+        dropped: set[str] = set()
+        removed = 0
+        with self.db:
+            expired = self.db.execute(
+                "SELECT key, sha256 FROM entries WHERE last_access < ?", (now - self.max_age,)
+            ).fetchall()
+            for key, sha in expired:
+                self._delete(key, sha)
+                dropped.add(sha)
+            removed += len(expired)
+
+            while self.total_bytes() > self.max_bytes:
+                lru = self.db.execute(
+                    "SELECT key, sha256 FROM entries ORDER BY last_access LIMIT 64"
+                ).fetchall()
+                if not lru:
+                    break
+                for key, sha in lru:
+                    if self.total_bytes() <= self.max_bytes:
+                        break
+                    self._delete(key, sha)
+                    removed += 1
+                    dropped.add(sha)
+
+            for sha in dropped:
+                if not self._referenced(sha):
+                    self._blob_path(sha).unlink(missing_ok=True)
+        return removed
+
+    def _referenced(self, sha256: str) -> bool:
+        row = self.db.execute("SELECT 1 FROM entries WHERE sha256 = ? LIMIT 1", (sha256,))
+        return row.fetchone() is not None
@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+
+class ImageScrubberError(Exception):
+    """Base class for errors raised by image_scrubber_core."""
+
+
+class MemoryBudgetExceeded(ImageScrubberError):
+    """An image cannot be processed within the configured memory budget."""
+
+    def __init__(self, required: int, budget: int, detail: str = "") -> None:
+        self.required = required
+        self.budget = budget
+        self.detail = detail
+        message = (
+            f"Image needs ~{required / 2**20:.1f} MiB to process, "
+            f"over the {budget / 2**20:.1f} MiB budget"
+        )
+        super().__init__(f"{message}: {detail}" if detail else message)
+
+    def __reduce__(self):  # type: ignore[no-untyped-def]
+        # Rebuilt from the original arguments when sent back from a worker process
+        return type(self), (self.required, self.budget, self.detail)
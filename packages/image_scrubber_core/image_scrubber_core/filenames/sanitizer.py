@@ -1,15 +1,31 @@
 from __future__ import annotations
 
+import os
 import re
+import threading
+import unicodedata
 from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Set, Tuple
+
+# Letters that NFKD does not decompose into ASCII
+_LETTERS = {"ß": "ss", "æ": "ae", "œ": "oe", "ø": "o", "đ": "d", "ð": "d", "þ": "th", "ł": "l"}
+_TRANSLITERATIONS = str.maketrans(
+    {**_LETTERS, **{k.upper(): v.capitalize() for k, v in _LETTERS.items() if k != "ß"}}
+)
 
 
 class FilenameSanitizer:
     """Sanitize file names for SEO & privacy."""
 
     @staticmethod
-    def sanitize(proposed_name: str) -> str:
-        name = Path(proposed_name).stem.lower()
+    def transliterate(text: str) -> str:
+        """Fold accented letters to ASCII (``Año Ñandú`` -> ``Ano Nandu``)."""
+        decomposed = unicodedata.normalize("NFKD", text.translate(_TRANSLITERATIONS))
+        return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+    @staticmethod
+    def sanitize(proposed_name: str, extension: str = ".jpg") -> str:
+        name = FilenameSanitizer.transliterate(Path(proposed_name).stem).lower()
 
         name = re.sub(r"[^a-z0-9\s\-]", "", name)
         name = re.sub(r"[\s_]+", "-", name)
@@ -19,4 +35,76 @@ class FilenameSanitizer:
         if not name:
             name = "image"
 
-        return f"{name}.jpg"
\ No newline at end of file
+        return f"{name}{extension}"
+
+    @staticmethod
+    def sanitize_many(
+        proposed_names: Iterable[str],
+        extension: str = ".jpg",
+        directory: str | Path | None = None,
+    ) -> List[str]:
+        """Sanitize a batch of names so none collides with another one of the batch
+        or with a file already in ``directory``."""
+        allocator = FilenameAllocator(directory)
+        return [allocator.allocate(name, extension) for name in proposed_names]
+
+
+class FilenameAllocator:
+    """Hand out unique sanitized names inside one directory.
+
+    The directory is listed once; after that every name is allocated from an
+    in-memory index with no filesystem calls. Collisions get deterministic
+    ``name-2.jpg``, ``name-3.jpg``... suffixes, and the next free suffix is
+    remembered per name so a batch of n identical names costs O(n).
+
+    Where names are shared with other processes, ``claim`` is called for every name
+    that is free locally; it reserves the name elsewhere (a database row...) and
+    returns ``False`` when someone else already has it.
+    """
+
+    def __init__(
+        self,
+        directory: str | Path | None = None,
+        claim: Callable[[str], bool] | None = None,
+    ) -> None:
+        self.directory = Path(directory) if directory is not None else None
+        self.claim = claim
+        self._taken: Set[str] = set()
+        # (stem, extension) -> next suffix to try
+        self._next: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        if self.directory is not None and self.directory.is_dir():
+            with os.scandir(self.directory) as entries:
+                self._taken = {entry.name.lower() for entry in entries}
+
+    def allocate(self, proposed_name: str, extension: str = ".jpg") -> str:
+        """Sanitize ``proposed_name`` and reserve a name no other call will get."""
+        sanitized = FilenameSanitizer.sanitize(proposed_name, extension)
+        with self._lock:
+            if self._take(sanitized):
+                return sanitized
+
+            stem = sanitized[: len(sanitized) - len(extension)]
+            key = (stem, extension)
+            n = self._next.get(key, 2)
+            while not self._take(f"{stem}-{n}{extension}"):
+                n += 1
+            self._next[key] = n + 1
+            return f"{stem}-{n}{extension}"
+
+    def take(self, name: str) -> bool:
+        """Reserve exactly ``name`` (not sanitized); ``False`` if it was taken."""
+        with self._lock:
+            return self._take(name)
+
+    def _take(self, name: str) -> bool:
+        if name.lower() in self._taken:
+            return False
+        # Taken either way: by this call, or by whoever claimed it before
+        self._taken.add(name.lower())
+        return self.claim is None or self.claim(name)
+
+    def release(self, name: str) -> None:
+        """Give ``name`` back, e.g. when writing the file failed."""
+        with self._lock:
+            self._taken.discard(name.lower())
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import math
+from typing import Callable, List, Tuple
+
+from PIL import Image, ImageFile
+
+from ..exceptions import MemoryBudgetExceeded
+
+Size = Tuple[int, int]
+
+# Bytes per pixel Pillow allocates for a mode; 3-channel modes are padded to 4
+_STORAGE_BYTES = {"1": 1, "L": 1, "P": 1, "I;16": 2, "I;16L": 2, "I;16B": 2, "I;16N": 2}
+
+# Raw (uncompressed) pixel layouts that can be read back a band of rows at a time,
+# with their bits per pixel on disk
+_RAW_BITS = {
+    "1": 1,
+    "L": 8,
+    "P": 8,
+    "LA": 16,
+    "I;16": 16,
+    "I;16L": 16,
+    "I;16B": 16,
+    "RGB": 24,
+    "BGR": 24,
+    "RGBA": 32,
+    "RGBX": 32,
+    "BGRA": 32,
+    "BGRX": 32,
+    "CMYK": 32,
+}
+
+# Modes Image.reduce() and filtered resizes accept
+REDUCIBLE_MODES = {"L", "LA", "RGB", "RGBA", "RGBX", "CMYK", "YCbCr", "I", "F"}
+
+
+def pixel_bytes(mode: str) -> int:
+    return _STORAGE_BYTES.get(mode, 4)
+
+
+def fit_within(size: Size, max_dimension: int | None) -> Size:
+    """``size`` scaled down so its longest side is at most ``max_dimension``."""
+    width, height = size
+    longest = max(width, height)
+    if not max_dimension or longest <= max_dimension:
+        return size
+    scale = max_dimension / longest
+    return (max(1, round(width * scale)), max(1, round(height * scale)))
+
+
+def _chain_peak(steps: List[Tuple[str, Size]]) -> int:
+    """Peak bytes of a chain of Pillow operations, each reading the previous result.
+
+    Every step allocates its output while its input is still alive, so the peak is
+    the largest sum of two consecutive buffers.
+    """
+    costs = [w * h * pixel_bytes(mode) for mode, (w, h) in steps]
+    if len(costs) == 1:
+        return costs[0]
+    return max(a + b for a, b in zip(costs, costs[1:]))
+
+
+def _dct_size(size: Size, target: Size) -> Size:
+    """Size libjpeg decodes at when drafting ``size`` towards ``target``."""
+    width, height = size
+    scale = min(width // target[0], height // target[1])
+    factor = next(s for s in (8, 4, 2, 1) if scale >= s)
+    return (-(-width // factor), -(-height // factor))
+
+
+class BoundedDecoder:
+    """Decode to RGB while keeping the peak allocation under a byte budget.
+
+    JPEG is drafted so libjpeg decodes straight to the needed scale. Uncompressed
+    rasters stored as one raw tile (BMP, single-strip TIFF) are read a band of rows
+    at a time and converted into a single preallocated RGB image, so neither the
+    full-size decoded buffer nor a second full-size conversion buffer ever exists.
+    Other formats, compressed TIFF and PNG included, have to be decoded in one
+    piece; they are only checked against the budget.
+    """
+
+    @staticmethod
+    def decode(
+        img: ImageFile.ImageFile,
+        budget: int,
+        max_dimension: int | None = None,
+        downscale: bool = False,
+    ) -> Image.Image | None:
+        """Return ``img`` decoded to RGB within ``budget`` bytes.
+
+        When the image does not fit, ``downscale`` shrinks the output until it
+        does where the format allows it; otherwise ``MemoryBudgetExceeded`` is
+        raised before anything large is allocated. Returns ``None`` when the
+        regular one-piece decode fits, which the caller then performs as usual.
+        """
+        target = fit_within(img.size, max_dimension)
+
+        if img.format == "JPEG" and len(img.tile) == 1:
+            return BoundedDecoder._decode_jpeg(img, budget, target, downscale)
+
+        need = BoundedDecoder.estimate(img, target)
+        if need <= budget:
+            # The one-piece decode is faster than banding and already fits
+            return None
+
+        layout = BoundedDecoder._raw_layout(img)
+        if layout is not None:
+            return BoundedDecoder._decode_banded(img, layout, budget, target, downscale)
+        raise MemoryBudgetExceeded(
+            need, budget, f"{img.format} images have to be decoded in one piece"
+        )
+
+    @staticmethod
+    def estimate(img: Image.Image, target: Size) -> int:
+        """Peak bytes of the regular decode, reduce, resize and convert chain."""
+        steps = [(img.mode, img.size)]
+        mode = img.mode
+        if mode not in REDUCIBLE_MODES and target != img.size:
+            mode = "RGB"
+            steps.append((mode, img.size))
+        factor = max(img.size) // max(target)
+        if factor > 1:
+            steps.append((mode, (-(-img.width // factor), -(-img.height // factor))))
+        if steps[-1][1] != target:
+            steps.append((mode, target))
+        if mode != "RGB":
+            steps.append(("RGB", target))
+        return _chain_peak(steps)
+
+    @staticmethod
+    def _fit_budget(
+        target: Size, peak: Callable[[Size], int], budget: int, downscale: bool
+    ) -> Size:
+        """Largest size no bigger than ``target`` whose ``peak`` fits ``budget``."""
+        need = peak(target)
+        if need <= budget:
+            return target
+        if not downscale:
+            raise MemoryBudgetExceeded(need, budget)
+
+        while need > budget:
+            longest = max(target)
+            shrunk = min(longest - 1, int(longest * math.sqrt(budget / need)))
+            if shrunk < 1:
+                raise MemoryBudgetExceeded(need, budget, "too large even when downscaled")
+            target = fit_within(target, shrunk)
+            need = peak(target)
+        return target
+
+    @staticmethod
+    def _decode_jpeg(
+        img: ImageFile.ImageFile, budget: int, target: Size, downscale: bool
+    ) -> Image.Image:
+        def peak(size: Size) -> int:
+            decoded = _dct_size(img.size, size)
+            steps = [(img.mode, decoded)]
+            if decoded != size:
+                steps.append((img.mode, size))
+            if img.mode != "RGB":
+                steps.append(("RGB", size))
+            return _chain_peak(steps)
+
+        target = BoundedDecoder._fit_budget(target, peak, budget, downscale)
+        if target != img.size:
+            img.draft("RGB", target)
+        out: Image.Image = img
+        if out.size != target:
+            out = out.resize(target, Image.Resampling.LANCZOS)
+        if out.mode != "RGB":
+            out = out.convert("RGB")
+        return out
+
+    @staticmethod
+    def _raw_layout(img: ImageFile.ImageFile) -> Tuple[str, int, int, int] | None:
+        """``(rawmode, offset, stride, orientation)`` of a single uncompressed tile."""
+        if len(img.tile) != 1 or img.fp is None:
+            return None
+        codec, extents, offset, args = img.tile[0]
+        if codec != "raw" or extents != (0, 0, img.width, img.height):
+            return None
+
+        if isinstance(args, str):
+            args = (args,)
+        if not args:
+            return None
+        rawmode = args[0]
+        stride = args[1] if len(args) > 1 else 0
+        orientation = args[2] if len(args) > 2 else 1
+        if rawmode not in _RAW_BITS:
+            return None
+        stride = stride or (img.width * _RAW_BITS[rawmode] + 7) // 8
+        return rawmode, offset, stride, orientation
+
+    @staticmethod
+    def _decode_banded(
+        img: ImageFile.ImageFile,
+        layout: Tuple[str, int, int, int],
+        budget: int,
+        target: Size,
+        downscale: bool,
+    ) -> Image.Image:
+        rawmode, offset, stride, orientation = layout
+        width, height = img.size
+        # Raw rows, the decoded band and its RGB conversion
+        row_cost = stride + width * (pixel_bytes(img.mode) + 4)
+
+        def band_rows(size: Size) -> int:
+            """Output rows per band that fit next to the output image (0 if none)."""
+            avail = budget - size[0] * size[1] * 4 - row_cost
+            per_row = row_cost * height / size[1] + size[0] * 4
+            return max(0, min(size[1], int(avail / per_row)))
+
+        def peak(size: Size) -> int:
+            rows = max(1, band_rows(size))
+            src_rows = math.ceil(rows * height / size[1]) + 1
+            return size[0] * size[1] * 4 + src_rows * row_cost + rows * size[0] * 4
+
+        target = BoundedDecoder._fit_budget(target, peak, budget, downscale)
+        rows = max(1, band_rows(target))
+        palette = img.palette if img.mode == "P" else None
+
+        out = Image.new("RGB", target)
+        scale_y = height / target[1]
+        fp = img.fp
+        assert fp is not None  # _raw_layout only accepts images with an open file
+        for y0 in range(0, target[1], rows):
+            y1 = min(target[1], y0 + rows)
+            top, bottom = y0 * scale_y, y1 * scale_y
+            src0, src1 = int(top), min(height, math.ceil(bottom))
+
+            # Bottom-up rasters (BMP) store the last row first
+            first = src0 if orientation > 0 else height - src1
+            fp.seek(offset + first * stride)
+            data = fp.read((src1 - src0) * stride)
+            band = Image.frombytes(
+                img.mode, (width, src1 - src0), data, "raw", rawmode, stride, orientation
+            )
+            if palette is not None:
+                # Palettes read from the file stay in their on-disk layout (rawmode)
+                if palette.rawmode:
+                    band.putpalette(palette.palette, palette.rawmode)
+                else:
+                    band.putpalette(palette.tobytes(), palette.mode)
+            band = band.convert("RGB")
+            if band.size != (target[0], y1 - y0):
+                band = band.resize(
+                    (target[0], y1 - y0),
+                    Image.Resampling.BOX,
+                    box=(0, top - src0, width, bottom - src0),
+                )
+            out.paste(band, (0, y0))
+
+        img.close()
+        return out
@@ -1,27 +1,173 @@
 from __future__ import annotations
 
-from pathlib import Path
+import io
 from typing import Tuple
 
 from PIL import Image
 
+from ..instrumentation import stage
+from ..sources import ImageSource, check_exists, is_buffer
+from .bounded import REDUCIBLE_MODES, BoundedDecoder, fit_within
+
+JPEG_SOI = b"\xff\xd8"
+
+# Segments that survive the lossless strip: JFIF/JFXX headers, ICC profiles and the
+# Adobe transform flag (needed to decode CMYK/YCCK correctly). Everything else that
+# lives in APPn/COM (EXIF, XMP, IPTC, maker notes, MPF previews, comments) is dropped.
+_KEEP_APP_PREFIXES = {
+    0xE0: (b"JFIF\x00", b"JFXX\x00"),
+    0xE2: (b"ICC_PROFILE\x00",),
+    0xEE: (b"Adobe",),
+}
+_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+
 
 class MetadataCleaner:
     """Responsible of deleting EXIF metadata preserving visual quality."""
 
     @staticmethod
-    def clean(path: str | Path) -> Tuple[Image.Image, bool]:
-        p = Path(path)
-        if not p.is_file():
-            raise FileNotFoundError(f"Image not found: {p}")
+    def clean(
+        path: ImageSource,
+        max_dimension: int | None = None,
+        memory_budget: int | None = None,
+        downscale_to_budget: bool = False,
+    ) -> Tuple[Image.Image, bool]:
+        """Decode ``path`` (a path, a bytes-like buffer or a binary stream).
+
+        With ``max_dimension`` the longest side of the result is capped, and large
+        images are decoded at reduced size instead of being scaled after the fact.
+
+        With ``memory_budget`` (bytes) the decode keeps its peak allocation under the
+        budget, see ``BoundedDecoder``; images that cannot fit raise
+        ``MemoryBudgetExceeded`` unless ``downscale_to_budget`` allows shrinking them.
+        """
+        check_exists(path)
+
+        bytes_in = len(path) if is_buffer(path) else None  # type: ignore[arg-type]
+        with stage("decode", bytes_in=bytes_in) as event:
+            opened = Image.open(io.BytesIO(path) if is_buffer(path) else path)  # type: ignore[arg-type]
+            event["format"] = opened.format
 
-        img = Image.open(p)
+            had_metadata = "exif" in opened.info
 
-        had_metadata = "exif" in img.info
+            img: Image.Image = opened
+            bounded = None
+            if memory_budget:
+                bounded = BoundedDecoder.decode(
+                    opened, memory_budget, max_dimension, downscale_to_budget
+                )
+            if bounded is not None:
+                img = bounded
+            else:
+                if max_dimension:
+                    img = MetadataCleaner._downscale(img, max_dimension)
+                img.load()
+            event["width"], event["height"] = img.size
 
         # Normalized to RGB to avoid leaks in alpha channels
         if img.mode not in ("RGB",):
-            img = img.convert("RGB")
+            with stage("convert", width=img.width, height=img.height):
+                img = img.convert("RGB")
 
         # Return only the cleanned image in memory
-        return img, had_metadata
\ No newline at end of file
+        return img, had_metadata
+
+    @staticmethod
+    def _downscale(img: Image.Image, max_dimension: int) -> Image.Image:
+        target = fit_within(img.size, max_dimension)
+        if target == img.size:
+            return img
+        longest = max(img.size)
+
+        if img.format == "JPEG":
+            # DCT scaling: libjpeg decodes straight at 1/2, 1/4 or 1/8 of the size,
+            # never below ``target``
+            img.draft("RGB", target)
+        else:
+            if img.mode not in REDUCIBLE_MODES:
+                # reduce() and filtered resizes reject palette, bilevel and 16-bit data
+                img = img.convert("RGB")
+            factor = longest // max_dimension
+            if factor > 1:
+                # Cheap box reduction by an integer factor before the final resample
+                img = img.reduce(factor)
+
+        if img.size != target:
+            img = img.resize(target, Image.Resampling.LANCZOS)
+        return img
+
+    @staticmethod
+    def is_jpeg(data: bytes | bytearray | memoryview) -> bool:
+        return bytes(data[:2]) == JPEG_SOI
+
+    @staticmethod
+    def strip_jpeg(data: bytes | bytearray | memoryview) -> Tuple[bytes, bool]:
+        """Drop metadata segments from a JPEG without decoding it.
+
+        The entropy-coded scans are copied byte for byte, so there is no
+        generational loss. Anything after EOI (MPF previews, vendor trailers)
+        is discarded too.
+        """
+        if not MetadataCleaner.is_jpeg(data):
+            raise ValueError("Not a JPEG stream")
+        if isinstance(data, memoryview):
+            # memoryview has no find(); the scan loop below needs it
+            data = data.tobytes()
+
+        out = bytearray(JPEG_SOI)
+        had_metadata = False
+        pos = 2
+        size = len(data)
+
+        while pos < size:
+            if data[pos] != 0xFF:
+                raise ValueError(f"Corrupt JPEG: expected marker at offset {pos}")
+            while pos < size and data[pos] == 0xFF:
+                pos += 1
+            if pos >= size:
+                break
+            marker = data[pos]
+            pos += 1
+
+            if marker == 0xD9:
+                out += b"\xff\xd9"
+                return bytes(out), had_metadata
+            if marker in _STANDALONE_MARKERS:
+                out += bytes((0xFF, marker))
+                continue
+
+            if pos + 2 > size:
+                raise ValueError("Corrupt JPEG: truncated segment header")
+            length = int.from_bytes(data[pos : pos + 2], "big")
+            end = pos + length
+            if length < 2 or end > size:
+                raise ValueError("Corrupt JPEG: segment overruns file")
+
+            if marker == 0xFE or 0xE0 <= marker <= 0xEF:
+                payload = data[pos + 2 : end]
+                prefixes = _KEEP_APP_PREFIXES.get(marker, ())
+                if not payload.startswith(prefixes):
+                    had_metadata = True
+                    pos = end
+                    continue
+
+            out += bytes((0xFF, marker))
+            out += data[pos:end]
+            pos = end
+
+            if marker == 0xDA:
+                # Entropy-coded data runs until the next marker that is neither
+                # a stuffed 0xFF00 nor a restart marker.
+                scan_start = pos
+                while True:
+                    pos = data.find(b"\xff", pos)
+                    if pos == -1 or pos + 1 >= size:
+                        raise ValueError("Corrupt JPEG: missing EOI")
+                    nxt = data[pos + 1]
+                    if nxt == 0x00 or 0xD0 <= nxt <= 0xD7 or nxt == 0xFF:
+                        pos += 1 if nxt == 0xFF else 2
+                        continue
+                    break
+                out += data[scan_start:pos]
+
+        raise ValueError("Corrupt JPEG: missing EOI")
@@ -0,0 +1,333 @@
+from __future__ import annotations
+
+import io
+import struct
+from dataclasses import dataclass, field
+from typing import BinaryIO, Dict, Set, Tuple
+
+from ..sources import ImageSource, open_source
+
+# TIFF tags that point at (or embed) metadata blocks
+_TAG_EXIF_IFD = 0x8769
+_TAG_GPS_IFD = 0x8825
+_TAG_XMP = 0x02BC
+_TAG_IPTC = 0x83BB
+_TAG_PHOTOSHOP = 0x8649
+_TAG_ICC = 0x8773
+_TIFF_TEXT_TAGS = {0x010D, 0x010E, 0x010F, 0x0110, 0x0131, 0x013B, 0x8298}  # name, desc, make…
+
+_XMP_JPEG_PREFIX = b"http://ns.adobe.com/xap/1.0/\x00"
+_XMP_EXT_JPEG_PREFIX = b"http://ns.adobe.com/xmp/extension/\x00"
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+@dataclass(frozen=True)
+class MetadataReport:
+    """What an image carries, as read from its container headers only."""
+
+    format: str
+    width: int = 0
+    height: int = 0
+    mode: str = ""
+    kinds: frozenset[str] = field(default_factory=frozenset)
+
+    @property
+    def has_metadata(self) -> bool:
+        return bool(self.kinds)
+
+    @property
+    def has_exif(self) -> bool:
+        return "exif" in self.kinds
+
+    @property
+    def has_gps(self) -> bool:
+        return "gps" in self.kinds
+
+
+def _tiff_ifd0(block: bytes) -> Tuple[Dict[int, Tuple[int, int, int]], str]:
+    """Return IFD0 as ``{tag: (type, count, value_or_offset)}`` plus the byte order."""
+    if block[:2] == b"II":
+        order = "<"
+    elif block[:2] == b"MM":
+        order = ">"
+    else:
+        raise ValueError("Invalid TIFF header")
+    (offset,) = struct.unpack(order + "I", block[4:8])
+    (count,) = struct.unpack(order + "H", block[offset : offset + 2])
+    entries: Dict[int, Tuple[int, int, int]] = {}
+    for i in range(count):
+        start = offset + 2 + i * 12
+        tag, typ, n = struct.unpack(order + "HHI", block[start : start + 8])
+        if typ == 3 and n <= 2:
+            (value,) = struct.unpack(order + "H", block[start + 8 : start + 10])
+        else:
+            (value,) = struct.unpack(order + "I", block[start + 8 : start + 12])
+        entries[tag] = (typ, n, value)
+    return entries, order
+
+
+def _exif_kinds(tiff_block: bytes) -> Set[str]:
+    kinds = {"exif"}
+    try:
+        entries, _ = _tiff_ifd0(tiff_block)
+    except (ValueError, struct.error):
+        return kinds
+    if _TAG_GPS_IFD in entries:
+        kinds.add("gps")
+    return kinds
+
+
+class MetadataInspector:
+    """Report which metadata an image carries without decoding any pixels.
+
+    Only container headers and metadata segments are read, seeking over pixel data,
+    so files that are already clean can be skipped cheaply. Supports JPEG, PNG,
+    TIFF and WebP.
+    """
+
+    @staticmethod
+    def inspect(source: ImageSource) -> MetadataReport:
+        with open_source(source) as f:
+            return MetadataInspector._inspect_stream(f)
+
+    @staticmethod
+    def detect_format(head: bytes) -> str | None:
+        """Identify the container from its first 12 bytes (``None`` if unknown)."""
+        if head[:2] == b"\xff\xd8":
+            return "JPEG"
+        if head[:8] == _PNG_SIGNATURE:
+            return "PNG"
+        if head[:4] in (b"II*\x00", b"MM\x00*"):
+            return "TIFF"
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return "WEBP"
+        if head[:2] == b"BM":
+            return "BMP"
+        return None
+
+    @staticmethod
+    def _inspect_stream(f: BinaryIO) -> MetadataReport:
+        # Streams handed in by callers are inspected from their start
+        f.seek(0)
+        fmt = MetadataInspector.detect_format(f.read(12))
+        f.seek(0)
+        if fmt == "JPEG":
+            return MetadataInspector._inspect_jpeg(f)
+        if fmt == "PNG":
+            return MetadataInspector._inspect_png(f)
+        if fmt == "TIFF":
+            return MetadataInspector._inspect_tiff(f)
+        if fmt == "WEBP":
+            return MetadataInspector._inspect_webp(f)
+        raise ValueError("Unsupported image format")
+
+    @staticmethod
+    def _inspect_jpeg(f: BinaryIO) -> MetadataReport:
+        kinds: Set[str] = set()
+        width = height = 0
+        mode = ""
+        f.seek(2)
+        while True:
+            byte = f.read(1)
+            while byte == b"\xff":
+                byte = f.read(1)
+            if not byte:
+                break
+            marker = byte[0]
+            if marker == 0xD9 or marker == 0xDA:
+                # Everything after SOS is pixel data
+                break
+            if marker == 0x01 or 0xD0 <= marker <= 0xD7:
+                continue
+
+            raw = f.read(2)
+            if len(raw) < 2:
+                break
+            length = int.from_bytes(raw, "big") - 2
+
+            if marker in (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD,
+                          0xCE, 0xCF):
+                sof = f.read(length)
+                height, width = struct.unpack(">HH", sof[1:5])
+                mode = {1: "L", 3: "RGB", 4: "CMYK"}.get(sof[5], "")
+            elif marker == 0xE1:
+                payload = f.read(length)
+                if payload.startswith(b"Exif\x00\x00"):
+                    kinds |= _exif_kinds(payload[6:])
+                elif payload.startswith((_XMP_JPEG_PREFIX, _XMP_EXT_JPEG_PREFIX)):
+                    kinds.add("xmp")
+                else:
+                    kinds.add("other")
+            elif marker == 0xE2:
+                payload = f.read(length)
+                kinds.add("icc" if payload.startswith(b"ICC_PROFILE\x00") else "other")
+            elif marker == 0xED:
+                f.seek(length, io.SEEK_CUR)
+                kinds.add("iptc")
+            elif marker == 0xFE:
+                f.seek(length, io.SEEK_CUR)
+                kinds.add("text")
+            elif 0xE3 <= marker <= 0xEF and marker != 0xEE:
+                f.seek(length, io.SEEK_CUR)
+                kinds.add("other")
+            else:
+                f.seek(length, io.SEEK_CUR)
+
+        return MetadataReport("JPEG", width, height, mode, frozenset(kinds))
+
+    @staticmethod
+    def _inspect_png(f: BinaryIO) -> MetadataReport:
+        kinds: Set[str] = set()
+        width = height = 0
+        mode = ""
+        f.seek(8)
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            length, ctype = struct.unpack(">I4s", header)
+            if ctype == b"IHDR":
+                ihdr = f.read(length)
+                width, height, depth, color = struct.unpack(">IIBB", ihdr[:10])
+                mode = {0: "L", 2: "RGB", 3: "P", 4: "LA", 6: "RGBA"}.get(color, "")
+                if color == 0 and depth == 1:
+                    mode = "1"
+                elif color == 0 and depth == 16:
+                    mode = "I;16"
+                f.seek(4, io.SEEK_CUR)
+                continue
+            if ctype == b"IEND":
+                break
+            if ctype == b"eXIf":
+                kinds |= _exif_kinds(f.read(length))
+                f.seek(4, io.SEEK_CUR)
+                continue
+            if ctype == b"iTXt":
+                keyword = f.read(min(length, 80)).split(b"\x00", 1)[0]
+                kinds.add("xmp" if keyword == b"XML:com.adobe.xmp" else "text")
+                f.seek(length - min(length, 80) + 4, io.SEEK_CUR)
+                continue
+            if ctype in (b"tEXt", b"zTXt"):
+                keyword = f.read(min(length, 80)).split(b"\x00", 1)[0]
+                if keyword.startswith(b"Raw profile type exif"):
+                    kinds.add("exif")
+                elif keyword.startswith(b"Raw profile type iptc"):
+                    kinds.add("iptc")
+                elif keyword.startswith(b"Raw profile type xmp"):
+                    kinds.add("xmp")
+                else:
+                    kinds.add("text")
+                f.seek(length - min(length, 80) + 4, io.SEEK_CUR)
+                continue
+            if ctype == b"iCCP":
+                kinds.add("icc")
+            elif ctype == b"tIME":
+                kinds.add("text")
+            # Pixel data (IDAT) and other chunks are skipped, never read
+            f.seek(length + 4, io.SEEK_CUR)
+
+        return MetadataReport("PNG", width, height, mode, frozenset(kinds))
+
+    @staticmethod
+    def _inspect_tiff(f: BinaryIO) -> MetadataReport:
+        head = f.read(8)
+        order = "<" if head[:2] == b"II" else ">"
+        (offset,) = struct.unpack(order + "I", head[4:8])
+        f.seek(offset)
+        (count,) = struct.unpack(order + "H", f.read(2))
+        # Rebuild a minimal TIFF block holding only IFD0 so the shared parser applies
+        ifd = f.read(count * 12)
+        entries, _ = _tiff_ifd0(
+            head[:4] + struct.pack(order + "I", 8) + struct.pack(order + "H", count) + ifd
+        )
+
+        kinds: Set[str] = set()
+        if _TAG_EXIF_IFD in entries:
+            kinds.add("exif")
+        if _TAG_GPS_IFD in entries:
+            kinds |= {"exif", "gps"}
+        if _TAG_XMP in entries:
+            kinds.add("xmp")
+        if _TAG_IPTC in entries or _TAG_PHOTOSHOP in entries:
+            kinds.add("iptc")
+        if _TAG_ICC in entries:
+            kinds.add("icc")
+        if _TIFF_TEXT_TAGS & entries.keys():
+            kinds.add("text")
+
+        width = entries.get(0x0100, (0, 0, 0))[2]
+        height = entries.get(0x0101, (0, 0, 0))[2]
+        photometric = entries.get(0x0106, (0, 0, 1))[2]
+        samples = entries.get(0x0115, (0, 0, 1))[2]
+        _, bits_count, bits = entries.get(0x0102, (3, 1, 1))
+        if bits_count > 2:
+            # Per-sample values live out of line; they are all equal in practice
+            f.seek(bits)
+            (bits,) = struct.unpack(order + "H", f.read(2))
+
+        if photometric in (0, 1):
+            mode = {1: "1", 8: "L", 16: "I;16"}.get(bits, "L")
+            if samples == 2:
+                mode = "LA"
+        elif photometric == 2:
+            mode = "RGBA" if samples == 4 else "RGB"
+        elif photometric == 3:
+            mode = "P"
+        elif photometric == 5:
+            mode = "CMYK"
+        elif photometric == 6:
+            mode = "YCbCr"
+        else:
+            mode = ""
+
+        return MetadataReport("TIFF", width, height, mode, frozenset(kinds))
+
+    @staticmethod
+    def _inspect_webp(f: BinaryIO) -> MetadataReport:
+        kinds: Set[str] = set()
+        width = height = 0
+        alpha = False
+        f.seek(12)
+        while True:
+            header = f.read(8)
+            if len(header) < 8:
+                break
+            ctype, length = struct.unpack("<4sI", header)
+            padded = length + (length & 1)
+            if ctype == b"VP8X":
+                data = f.read(10)
+                alpha = bool(data[0] & 0x10)
+                width = int.from_bytes(data[4:7], "little") + 1
+                height = int.from_bytes(data[7:10], "little") + 1
+                f.seek(padded - 10, io.SEEK_CUR)
+                continue
+            if ctype == b"VP8 " and not width:
+                data = f.read(10)
+                width = int.from_bytes(data[6:8], "little") & 0x3FFF
+                height = int.from_bytes(data[8:10], "little") & 0x3FFF
+                f.seek(padded - 10, io.SEEK_CUR)
+                continue
+            if ctype == b"VP8L" and not width:
+                data = f.read(5)
+                bits = int.from_bytes(data[1:5], "little")
+                width = (bits & 0x3FFF) + 1
+                height = ((bits >> 14) & 0x3FFF) + 1
+                alpha = bool((bits >> 28) & 1)
+                f.seek(padded - 5, io.SEEK_CUR)
+                continue
+            if ctype == b"EXIF":
+                payload = f.read(length)
+                if payload.startswith(b"Exif\x00\x00"):
+                    payload = payload[6:]
+                kinds |= _exif_kinds(payload)
+                f.seek(padded - length, io.SEEK_CUR)
+                continue
+            if ctype == b"XMP ":
+                kinds.add("xmp")
+            elif ctype == b"ICCP":
+                kinds.add("icc")
+            elif ctype == b"ALPH":
+                alpha = True
+            f.seek(padded, io.SEEK_CUR)
+
+        return MetadataReport("WEBP", width, height, "RGBA" if alpha else "RGB", frozenset(kinds))
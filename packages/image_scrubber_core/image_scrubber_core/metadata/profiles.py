@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Dict
+
+# Output formats the writer can produce, with the extension used for file names
+FORMAT_EXTENSIONS: Dict[str, str] = {
+    "JPEG": ".jpg",
+    "PNG": ".png",
+    "WEBP": ".webp",
+    "TIFF": ".tiff",
+}
+
+_FORMAT_ALIASES = {"JPG": "JPEG", "TIF": "TIFF"}
+
+# Encoders that seek back while writing and therefore cannot stream into a sink
+SEEKING_FORMATS = {"TIFF"}
+
+
+@dataclass(frozen=True)
+class EncoderProfile:
+    """Named set of encoder settings trading CPU time for output size.
+
+    Measured throughput for each profile is listed in the core package README.
+    """
+
+    name: str
+    jpeg_quality: int
+    jpeg_optimize: bool
+    jpeg_progressive: bool
+    # Pillow's chroma subsampling: 0 = 4:4:4, 1 = 4:2:2, 2 = 4:2:0
+    jpeg_subsampling: int
+    png_compress_level: int
+    png_optimize: bool
+    webp_quality: int
+    webp_method: int
+    tiff_compression: str | None
+
+    def save_kwargs(self, output_format: str, quality: int | None = None) -> Dict[str, Any]:
+        """Pillow ``save()`` keyword arguments for ``output_format``.
+
+        ``quality`` overrides the profile quality for the lossy formats.
+        """
+        if output_format == "JPEG":
+            return {
+                "quality": quality or self.jpeg_quality,
+                "optimize": self.jpeg_optimize,
+                "progressive": self.jpeg_progressive,
+                "subsampling": self.jpeg_subsampling,
+            }
+        if output_format == "PNG":
+            return {"compress_level": self.png_compress_level, "optimize": self.png_optimize}
+        if output_format == "WEBP":
+            return {"quality": quality or self.webp_quality, "method": self.webp_method}
+        if output_format == "TIFF":
+            return {"compression": self.tiff_compression} if self.tiff_compression else {}
+        raise ValueError(f"Unsupported output format: {output_format}")
+
+
+ENCODER_PROFILES: Dict[str, EncoderProfile] = {
+    "fast": EncoderProfile(
+        name="fast",
+        jpeg_quality=90,
+        jpeg_optimize=False,
+        jpeg_progressive=False,
+        jpeg_subsampling=2,
+        png_compress_level=1,
+        png_optimize=False,
+        webp_quality=80,
+        webp_method=0,
+        tiff_compression=None,
+    ),
+    # The historical MetadataWriter settings
+    "balanced": EncoderProfile(
+        name="balanced",
+        jpeg_quality=95,
+        jpeg_optimize=True,
+        jpeg_progressive=False,
+        jpeg_subsampling=2,
+        png_compress_level=6,
+        png_optimize=False,
+        webp_quality=90,
+        webp_method=4,
+        tiff_compression="tiff_lzw",
+    ),
+    "smallest": EncoderProfile(
+        name="smallest",
+        jpeg_quality=85,
+        jpeg_optimize=True,
+        jpeg_progressive=True,
+        jpeg_subsampling=2,
+        png_compress_level=9,
+        png_optimize=True,
+        webp_quality=80,
+        webp_method=6,
+        tiff_compression="tiff_adobe_deflate",
+    ),
+}
+
+DEFAULT_PROFILE = "balanced"
+
+
+def normalize_format(output_format: str) -> str:
+    """Upper-case ``output_format`` and fold aliases such as ``jpg`` and ``tif``."""
+    fmt = output_format.upper()
+    fmt = _FORMAT_ALIASES.get(fmt, fmt)
+    if fmt not in FORMAT_EXTENSIONS:
+        raise ValueError(
+            f"Unsupported output format {output_format!r}; expected one of "
+            f"{sorted(FORMAT_EXTENSIONS)}"
+        )
+    return fmt
+
+
+def get_profile(profile: str | EncoderProfile) -> EncoderProfile:
+    if isinstance(profile, EncoderProfile):
+        return profile
+    try:
+        return ENCODER_PROFILES[profile]
+    except KeyError:
+        raise ValueError(
+            f"Unknown encoder profile {profile!r}; expected one of {sorted(ENCODER_PROFILES)}"
+        ) from None
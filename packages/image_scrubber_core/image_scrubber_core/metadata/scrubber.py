@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import io
+import shutil
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Dict, Any, Tuple
+
+from ..exceptions import MemoryBudgetExceeded
+from ..instrumentation import stage
+from ..security.hashing import FileHasher
+from ..sources import (
+    ImageSink,
+    ImageSource,
+    is_buffer,
+    is_path,
+    open_sink,
+    peek_source,
+    read_source,
+)
+from .cleaner import MetadataCleaner
+from .inspector import MetadataInspector
+from .profiles import DEFAULT_PROFILE, FORMAT_EXTENSIONS, get_profile, normalize_format
+from .writer import MetadataWriter
+
+if TYPE_CHECKING:
+    from ..cache.result_cache import ScrubCache
+
+
+@dataclass(frozen=True)
+class ScrubOptions:
+    """How an image is scrubbed and encoded."""
+
+    # Overrides the profile quality for lossy formats
+    quality: int | None = None
+    extra_exif: Dict[str, Dict[int, Any]] | None = None
+    # Strip JPEG -> JPEG at segment level instead of re-encoding
+    lossless: bool = True
+    profile: str = DEFAULT_PROFILE
+    # JPEG, PNG, WEBP or TIFF; ``None`` keeps the input format when it can be written
+    output_format: str | None = "JPEG"
+    # Cap on the longest side of the output, applied while decoding
+    max_dimension: int | None = None
+    # Peak bytes a single decode may allocate; ``None`` leaves it unbounded
+    memory_budget: int | None = None
+    # Shrink images that do not fit the budget instead of rejecting them
+    downscale_to_budget: bool = False
+
+    def __post_init__(self) -> None:
+        # Fail when the options are built, not halfway through a batch
+        get_profile(self.profile)
+        if self.output_format:
+            normalize_format(self.output_format)
+        if self.max_dimension is not None and self.max_dimension < 1:
+            raise ValueError("max_dimension must be a positive number of pixels")
+        if self.memory_budget is not None and self.memory_budget < 1:
+            raise ValueError("memory_budget must be a positive number of bytes")
+
+
+DEFAULT_OPTIONS = ScrubOptions()
+
+
+class ImageScrubber:
+    """Clean an image and write it with generic metadata in a single step."""
+
+    @staticmethod
+    def resolve_format(source: ImageSource, output_format: str | None) -> str:
+        """Return the format ``source`` will be written in."""
+        if output_format:
+            return normalize_format(output_format)
+        detected = MetadataInspector.detect_format(peek_source(source, 12))
+        return detected if detected in FORMAT_EXTENSIONS else "JPEG"
+
+    @staticmethod
+    def extension_for(source: ImageSource, options: ScrubOptions = DEFAULT_OPTIONS) -> str:
+        """File extension matching the format ``source`` will be written in."""
+        return FORMAT_EXTENSIONS[ImageScrubber.resolve_format(source, options.output_format)]
+
+    @staticmethod
+    def scrub(
+        input_path: ImageSource,
+        output_path: ImageSink,
+        options: ScrubOptions = DEFAULT_OPTIONS,
+        cache: ScrubCache | None = None,
+        input_sha256: str | None = None,
+    ) -> Tuple[bool, str]:
+        """Scrub ``input_path`` into ``output_path``.
+
+        JPEG inputs written back as JPEG are stripped at segment level when
+        ``options.lossless`` is set; everything else goes through the decode/re-encode
+        path. The input may be a path, a bytes-like buffer or a binary stream, and the
+        output a path or a writable stream, so in-memory callers never touch the
+        disk. Returns whether the input had metadata and the sha256 of the written
+        output.
+
+        With a ``cache``, an input already scrubbed with the same settings is served
+        from it instead of being decoded again. Callers that hashed the input while
+        receiving it pass ``input_sha256`` so it is not read and hashed a second time.
+        """
+        source = input_path
+        if not (is_path(source) or is_buffer(source) or source.seekable()):  # type: ignore[union-attr]
+            source = source.read()  # type: ignore[union-attr]
+
+        output_format = ImageScrubber.resolve_format(source, options.output_format)
+
+        with stage("scrub", format=output_format):
+            if cache is not None:
+                return ImageScrubber._scrub_cached(
+                    source, output_path, options, output_format, cache, input_sha256
+                )
+            return ImageScrubber._scrub_direct(source, output_path, options, output_format)
+
+    @staticmethod
+    def _scrub_direct(
+        source: ImageSource,
+        output_path: ImageSink,
+        options: ScrubOptions,
+        output_format: str,
+    ) -> Tuple[bool, str]:
+        if (
+            options.lossless
+            and output_format == "JPEG"
+            and MetadataCleaner.is_jpeg(peek_source(source, 2))
+            and ImageScrubber._fits(source, options.max_dimension)
+        ):
+            with stage("read") as event:
+                data = read_source(source)
+                event["bytes_in"] = len(data)
+            # The stripped copy sits next to the input
+            if options.memory_budget and 2 * len(data) > options.memory_budget:
+                raise MemoryBudgetExceeded(2 * len(data), options.memory_budget)
+            with stage("strip", bytes_in=len(data), format="JPEG") as event:
+                stripped, had_meta = MetadataCleaner.strip_jpeg(data)
+                event["bytes_out"] = len(stripped)
+            _, sha = MetadataWriter.add_generic_to_jpeg(stripped, output_path, options.extra_exif)
+            return had_meta, sha
+
+        img, had_meta = MetadataCleaner.clean(
+            source, options.max_dimension, options.memory_budget, options.downscale_to_budget
+        )
+        _, sha = MetadataWriter.add_generic_and_save(
+            img,
+            output_path,
+            options.quality,
+            options.extra_exif,
+            profile=options.profile,
+            output_format=output_format,
+        )
+        return had_meta, sha
+
+    @staticmethod
+    def _fits(source: ImageSource, max_dimension: int | None) -> bool:
+        """Whether ``source`` is within ``max_dimension`` (read from headers only)."""
+        if not max_dimension:
+            return True
+        report = MetadataInspector.inspect(source)
+        return max(report.width, report.height) <= max_dimension
+
+    @staticmethod
+    def _scrub_cached(
+        source: ImageSource,
+        output_path: ImageSink,
+        options: ScrubOptions,
+        output_format: str,
+        cache: ScrubCache,
+        input_sha256: str | None = None,
+    ) -> Tuple[bool, str]:
+        if input_sha256 is None:
+            source = read_source(source)
+            with stage("hash", bytes_in=len(source)):
+                input_sha256 = FileHasher.sha256(source)
+        settings = asdict(options)
+        settings["output_format"] = output_format
+        key = cache.make_key(input_sha256, **settings)
+
+        with stage("cache") as event:
+            hit = cache.get(key)
+            if hit is not None:
+                blob, had_meta, sha = hit
+                with blob.open("rb") as src, open_sink(output_path) as dst:
+                    shutil.copyfileobj(src, dst)
+                event["bytes_out"] = blob.stat().st_size
+                return had_meta, sha
+
+        out = io.BytesIO()
+        had_meta, sha = ImageScrubber._scrub_direct(source, out, options, output_format)
+        with open_sink(output_path) as dst:
+            dst.write(out.getbuffer())
+        cache.put(key, out.getvalue(), had_meta, sha)
+        return had_meta, sha
+
+    @staticmethod
+    def scrub_bytes(
+        input_data: ImageSource,
+        options: ScrubOptions = DEFAULT_OPTIONS,
+    ) -> Tuple[bytes, bool, str]:
+        """Scrub entirely in memory and return ``(output_bytes, had_metadata, sha256)``."""
+        out = io.BytesIO()
+        had_meta, sha = ImageScrubber.scrub(input_data, out, options)
+        return out.getvalue(), had_meta, sha
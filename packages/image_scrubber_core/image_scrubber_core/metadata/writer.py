@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+import io
 from pathlib import Path
-from typing import Dict, Any
+from typing import IO, Dict, Any, Tuple, cast
 
 import piexif
 from PIL import Image
 
+from ..instrumentation import stage
+from ..security.hashing import HashingSink
+from ..sources import ImageSink, is_path, open_sink
+from .profiles import DEFAULT_PROFILE, SEEKING_FORMATS, EncoderProfile, get_profile
+
 
 class MetadataWriter:
     """Write safe generic metadata to avoid fingerprinting."""
@@ -19,30 +25,87 @@ class MetadataWriter:
     }
 
     @classmethod
-    def add_generic_and_save(
-        cls,
-        img: Image.Image,
-        output_path: str | Path,
-        quality: int = 95,
-        extra_exif: Dict[str, Dict[int, Any]] | None = None,
-    ) -> None:
-        p = Path(output_path)
-        p.parent.mkdir(parents=True, exist_ok=True)
-
-        exif_dict = cls.DEFAULT_GENERIC.copy()
+    def build_exif(cls, extra_exif: Dict[str, Dict[int, Any]] | None = None) -> bytes:
+        exif_dict = {ifd: dict(tags) for ifd, tags in cls.DEFAULT_GENERIC.items()}
         if extra_exif:
             for ifd, data in extra_exif.items():
                 exif_dict.setdefault(ifd, {}).update(data)
 
         try:
-            exif_bytes = piexif.dump(exif_dict)
+            exif: bytes = piexif.dump(exif_dict)
         except Exception:
-            exif_bytes = b""
-
-        img.save(
-            p,
-            "JPEG",
-            quality=quality,
-            optimize=True,
-            exif=exif_bytes,
-        )
\ No newline at end of file
+            return b""
+        return exif
+
+    @classmethod
+    def add_generic_and_save(
+        cls,
+        img: Image.Image,
+        output_path: ImageSink,
+        quality: int | None = None,
+        extra_exif: Dict[str, Dict[int, Any]] | None = None,
+        profile: str | EncoderProfile = DEFAULT_PROFILE,
+        output_format: str = "JPEG",
+    ) -> Tuple[Path | None, str]:
+        """Encode ``img`` to ``output_path`` and return the path with its sha256.
+
+        ``profile`` selects the encoder settings (``fast``, ``balanced``, ``smallest``)
+        and ``output_format`` one of JPEG, PNG, WEBP or TIFF; ``quality`` overrides the
+        profile quality. ``output_path`` may also be a writable binary stream (e.g.
+        ``io.BytesIO``), in which case the returned path is ``None``. The digest is
+        computed while the bytes are written, so the output never has to be read back.
+        """
+        kwargs = get_profile(profile).save_kwargs(output_format, quality)
+        with stage("exif"):
+            exif_bytes = cls.build_exif(extra_exif)
+
+        with (
+            stage("encode", width=img.width, height=img.height, format=output_format) as event,
+            open_sink(output_path) as f,
+        ):
+            sink = HashingSink(f)
+            if output_format in SEEKING_FORMATS:
+                buf = io.BytesIO()
+                img.save(buf, output_format, exif=exif_bytes, **kwargs)
+                sink.write(buf.getbuffer())
+            else:
+                # A RawIOBase is not an IO[bytes] to the type checker, but Pillow only
+                # calls write/flush on it
+                img.save(cast(IO[bytes], sink), output_format, exif=exif_bytes, **kwargs)
+            event["bytes_out"] = sink.bytes_written
+        return cls._written_path(output_path), sink.hexdigest()
+
+    @classmethod
+    def add_generic_to_jpeg(
+        cls,
+        jpeg_data: bytes,
+        output_path: ImageSink,
+        extra_exif: Dict[str, Dict[int, Any]] | None = None,
+    ) -> Tuple[Path | None, str]:
+        """Insert the generic EXIF block into an already stripped JPEG and write it.
+
+        The compressed image data is not touched. Returns the path (``None`` for
+        streams) and its sha256.
+        """
+        exif_bytes = cls.build_exif(extra_exif)
+
+        # APP1 goes right after SOI, or after the JFIF APP0 segment when present
+        insert_at = 2
+        if jpeg_data[2:4] == b"\xff\xe0":
+            insert_at = 4 + int.from_bytes(jpeg_data[4:6], "big")
+
+        segment = b""
+        if exif_bytes:
+            segment = b"\xff\xe1" + (len(exif_bytes) + 2).to_bytes(2, "big") + exif_bytes
+
+        with stage("write", format="JPEG") as event, open_sink(output_path) as f:
+            sink = HashingSink(f)
+            sink.write(jpeg_data[:insert_at])
+            sink.write(segment)
+            sink.write(jpeg_data[insert_at:])
+            event["bytes_out"] = sink.bytes_written
+        return cls._written_path(output_path), sink.hexdigest()
+
+    @staticmethod
+    def _written_path(output_path: ImageSink) -> Path | None:
+        return Path(output_path) if is_path(output_path) else None  # type: ignore[arg-type]
@@ -1,20 +1,193 @@
 from __future__ import annotations
 
 import hashlib
+import io
+import mmap
+import os
+import zlib
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterable, Iterator, Sequence
+
+from ..sources import ImageSource, is_buffer, is_path
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+DEFAULT_ALGORITHMS = ("sha256", "blake2b")
+
+# Fast non-cryptographic checksum, only meant to pre-group candidates for dedupe
+CHECKSUM = "crc32"
+
+# Slice fed to every digest in turn: big enough that hashlib drops the GIL and the
+# per-call overhead vanishes, small enough to still be in cache for the next digest
+_CHUNK = 1 << 20
+
+
+class _Crc32:
+    """hashlib-style wrapper around ``zlib.crc32``."""
+
+    def __init__(self) -> None:
+        self._value = 0
+
+    def update(self, data: Any) -> None:
+        self._value = zlib.crc32(data, self._value)
+
+    def hexdigest(self) -> str:
+        return f"{self._value:08x}"
+
+
+def _new_digests(algorithms: Sequence[str], checksum: bool) -> Dict[str, Any]:
+    digests: Dict[str, Any] = {name: hashlib.new(name) for name in algorithms}
+    if checksum:
+        digests[CHECKSUM] = _Crc32()
+    return digests
+
+
+def _feed(digests: Dict[str, Any], data: Any) -> None:
+    view = memoryview(data)
+    for start in range(0, len(view), _CHUNK):
+        chunk = view[start : start + _CHUNK]
+        for h in digests.values():
+            h.update(chunk)
+
+
+@dataclass(frozen=True)
+class HashResult:
+    """Digests of one item of a ``FileHasher.hash_many`` batch."""
+
+    index: int
+    source: str
+    digests: Dict[str, str] = field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class HashingSink(io.RawIOBase):
+    """Write-through wrapper that hashes every byte on its way to ``fp``.
+
+    It deliberately has no ``fileno()``: Pillow would otherwise write straight to the
+    descriptor and bypass the digest.
+    """
+
+    def __init__(self, fp: BinaryIO, algorithm: str = "sha256") -> None:
+        super().__init__()
+        self._fp = fp
+        self._hash = hashlib.new(algorithm)
+        self.bytes_written = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: bytes | bytearray | memoryview) -> int:  # type: ignore[override]
+        n = self._fp.write(b)
+        if n is None:
+            n = len(b)
+        self._hash.update(memoryview(b)[:n])
+        self.bytes_written += n
+        return n
+
+    def flush(self) -> None:
+        if not self._fp.closed:
+            self._fp.flush()
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
 
 
 class FileHasher:
     """Calcula hashes criptográficos para auditoría y verificación de integridad."""
 
     @staticmethod
-    def sha256(path: str | Path) -> str:
-        p = Path(path)
-        if not p.is_file():
-            raise FileNotFoundError(f"File not found: {p}")
-
-        h = hashlib.sha256()
-        with p.open("rb") as f:
-            for chunk in iter(lambda: f.read(8192), b""):
-                h.update(chunk)
-        return h.hexdigest()
\ No newline at end of file
+    def sha256(path: ImageSource) -> str:
+        """Hash a file path, a bytes-like buffer or a binary stream (from its position)."""
+        return FileHasher.digests(path, ("sha256",))["sha256"]
+
+    @staticmethod
+    def digests(
+        path: ImageSource,
+        algorithms: Sequence[str] = DEFAULT_ALGORITHMS,
+        checksum: bool = False,
+    ) -> Dict[str, str]:
+        """Compute every digest in ``algorithms`` (plus ``crc32`` with ``checksum``)
+        in a single pass over ``path``.
+
+        Files are memory-mapped, so the data is hashed straight from the page cache
+        without being copied into Python; streams are read in 1 MiB blocks.
+        """
+        digests = _new_digests(algorithms, checksum)
+
+        if is_buffer(path):
+            _feed(digests, path)
+        elif not is_path(path):
+            stream: BinaryIO = path  # type: ignore[assignment]
+            if not hasattr(stream, "readinto"):
+                for chunk in iter(lambda: stream.read(_CHUNK), b""):
+                    _feed(digests, chunk)
+            else:
+                # One reusable buffer instead of a new bytes object per block
+                view = memoryview(bytearray(_CHUNK))
+                for n in iter(lambda: stream.readinto(view), 0):
+                    if n is None:
+                        break
+                    _feed(digests, view[:n])
+        else:
+            p = Path(path)  # type: ignore[arg-type]
+            if not p.is_file():
+                raise FileNotFoundError(f"File not found: {p}")
+            with p.open("rb") as f:
+                # Empty files cannot be mapped; their digests are the initial ones
+                if os.fstat(f.fileno()).st_size:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        _feed(digests, mapped)
+
+        return {name: h.hexdigest() for name, h in digests.items()}
+
+    @staticmethod
+    def hash_many(
+        paths: Iterable[str | Path],
+        algorithms: Sequence[str] = DEFAULT_ALGORITHMS,
+        checksum: bool = False,
+        max_workers: int | None = None,
+    ) -> Iterator[HashResult]:
+        """Hash many files on a thread pool, yielding results as they complete.
+
+        hashlib and zlib release the GIL on large updates, so threads hash files in
+        parallel without the pickling cost of processes. Only ``2 * max_workers``
+        files are in flight at a time, and a failing file is reported through
+        ``HashResult.error`` instead of aborting the batch.
+        """
+        # Deferred: concurrent.futures is a noticeable share of a cold CLI start
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+        max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            pending: Dict[Future[Dict[str, str]], tuple[int, str]] = {}
+            items = enumerate(paths)
+            exhausted = False
+
+            while pending or not exhausted:
+                while not exhausted and len(pending) < max_workers * 2:
+                    try:
+                        index, path = next(items)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    future = pool.submit(FileHasher.digests, Path(path), algorithms, checksum)
+                    pending[future] = (index, str(path))
+
+                if not pending:
+                    continue
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index, label = pending.pop(future)
+                    try:
+                        yield HashResult(index=index, source=label, digests=future.result())
+                    except Exception as exc:
+                        yield HashResult(
+                            index=index, source=label, error=f"{type(exc).__name__}: {exc}"
+                        )
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import io
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+# Anything the core can read an image from, and anything it can write one to.
+ImageSource = str | Path | bytes | bytearray | memoryview | BinaryIO
+ImageSink = str | Path | BinaryIO
+
+
+def is_path(source: object) -> bool:
+    return isinstance(source, (str, Path))
+
+
+def is_buffer(source: object) -> bool:
+    return isinstance(source, (bytes, bytearray, memoryview))
+
+
+def check_exists(source: ImageSource) -> None:
+    if is_path(source):
+        p = Path(source)  # type: ignore[arg-type]
+        if not p.is_file():
+            raise FileNotFoundError(f"Image not found: {p}")
+
+
+@contextmanager
+def open_source(source: ImageSource) -> Iterator[BinaryIO]:
+    """Yield a seekable binary stream over ``source``.
+
+    Paths are opened (and closed afterwards); buffers are wrapped without copying
+    where possible; caller-owned streams are yielded as-is and left open.
+    """
+    if is_path(source):
+        check_exists(source)
+        with Path(source).open("rb") as f:  # type: ignore[arg-type]
+            yield f
+    elif is_buffer(source):
+        yield io.BytesIO(source)  # type: ignore[arg-type]
+    else:
+        stream: BinaryIO = source  # type: ignore[assignment]
+        if not stream.seekable():
+            stream = io.BytesIO(stream.read())
+        yield stream
+
+
+def read_source(source: ImageSource) -> bytes | bytearray | memoryview:
+    """Return the whole content of ``source``; buffers are returned unchanged."""
+    if is_buffer(source):
+        return source  # type: ignore[return-value]
+    if is_path(source):
+        check_exists(source)
+        return Path(source).read_bytes()  # type: ignore[arg-type]
+    return source.read()  # type: ignore[union-attr]
+
+
+def peek_source(source: ImageSource, size: int) -> bytes:
+    """Read the first ``size`` bytes without consuming a caller-owned stream."""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[:size])
+    if is_path(source):
+        check_exists(source)
+        with Path(source).open("rb") as f:  # type: ignore[arg-type]
+            return f.read(size)
+    stream: BinaryIO = source  # type: ignore[assignment]
+    if stream.seekable():
+        pos = stream.tell()
+        head = stream.read(size)
+        stream.seek(pos)
+        return head
+    raise ValueError("Cannot peek a non-seekable stream; pass bytes instead")
+
+
+@contextmanager
+def open_sink(sink: ImageSink) -> Iterator[BinaryIO]:
+    """Yield a writable stream for ``sink``, creating parent directories for paths."""
+    if is_path(sink):
+        p = Path(sink)  # type: ignore[arg-type]
+        p.parent.mkdir(parents=True, exist_ok=True)
+        with p.open("wb") as f:
+            yield f
+    else:
+        yield sink  # type: ignore[misc]
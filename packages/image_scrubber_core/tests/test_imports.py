@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List
+
+import pytest
+
+import image_scrubber_core
+
+# Whatever made image_scrubber_core importable here, the child gets it too
+PACKAGE_ROOT = Path(image_scrubber_core.__file__).resolve().parents[1]
+HEAVY = ["PIL", "piexif", "rich", "sqlite3", "concurrent.futures"]
+
+
+def _loaded_after(statement: str) -> List[str]:
+    """Run ``statement`` in a fresh interpreter; return the HEAVY modules it loaded."""
+    report = f"import json, sys; print(json.dumps([m for m in {HEAVY!r} if m in sys.modules]))"
+    code = f"{statement}\n{report}"
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(PACKAGE_ROOT), env.get("PYTHONPATH")]))
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True, env=env
+    )
+    loaded: List[str] = json.loads(result.stdout)
+    return loaded
+
+
+@pytest.mark.parametrize(
+    "statement",
+    [
+        "import image_scrubber_core",
+        "from image_scrubber_core import FileHasher, FilenameSanitizer",
+        "import image_scrubber_core; image_scrubber_core.__all__",
+    ],
+)
+def test_import_stays_light(statement: str) -> None:
+    assert _loaded_after(statement) == []
+
+
+def test_heavy_exports_load_on_first_access() -> None:
+    assert "PIL" in _loaded_after("from image_scrubber_core import ImageScrubber")
+
+
+def test_every_export_resolves() -> None:
+    for name in image_scrubber_core.__all__:
+        assert getattr(image_scrubber_core, name) is not None, name
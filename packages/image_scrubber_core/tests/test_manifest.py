@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import Dict, List
+
+from PIL import Image
+
+from image_scrubber_core.batch.manifest import RunManifest
+from image_scrubber_core.batch.pipeline import ScrubOutcome, ScrubPipeline
+from image_scrubber_core.security.hashing import FileHasher
+
+
+def _image(path: Path, color: tuple[int, int, int]) -> Path:
+    Image.new("RGB", (32, 24), color).save(path, "JPEG")
+    return path
+
+
+def _run(
+    inputs: List[Path], out: Path, manifest: RunManifest, on_collision: str = "rename"
+) -> Dict[str, ScrubOutcome]:
+    pipeline = ScrubPipeline(out, max_workers=1, on_collision=on_collision, manifest=manifest)
+    return {outcome.source: outcome for outcome in pipeline.run(inputs)}
+
+
+def test_rerun_skips_unchanged_inputs_and_records_digests(tmp_path: Path) -> None:
+    a = _image(tmp_path / "a.jpg", (255, 0, 0))
+    b = _image(tmp_path / "b.jpg", (0, 255, 0))
+    manifest = RunManifest(tmp_path / "manifest.sqlite3")
+
+    first = _run([a, b], tmp_path / "out", manifest)
+    assert not any(outcome.skipped for outcome in first.values())
+    entry = manifest.get(a)
+    assert entry is not None and entry.done
+    assert entry.input_sha256 == FileHasher.sha256(a)
+    assert entry.output_sha256 == first[str(a)].sha256
+
+    second = _run([a, b], tmp_path / "out", manifest)
+    assert all(outcome.skipped for outcome in second.values())
+    assert second[str(a)].sha256 == first[str(a)].sha256
+
+
+def test_touched_input_is_skipped_when_its_digest_did_not_change(tmp_path: Path) -> None:
+    a = _image(tmp_path / "a.jpg", (255, 0, 0))
+    manifest = RunManifest(tmp_path / "manifest.sqlite3")
+    _run([a], tmp_path / "out", manifest)
+
+    st = a.stat()
+    os.utime(a, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert _run([a], tmp_path / "out", manifest)[str(a)].skipped
+
+    _image(a, (0, 0, 255))
+    again = _run([a], tmp_path / "out", manifest)[str(a)]
+    assert again.ok and not again.skipped
+    # Rewritten in place rather than next to the old output
+    assert again.output_path == tmp_path / "out" / "a.jpg"
+
+
+def test_interrupted_items_are_scrubbed_again_into_their_output(tmp_path: Path) -> None:
+    a = _image(tmp_path / "a.jpg", (255, 0, 0))
+    manifest = RunManifest(tmp_path / "manifest.sqlite3")
+    output = _run([a], tmp_path / "out", manifest)[str(a)].output_path
+    # What a run killed between submitting the item and recording it leaves behind
+    with manifest.db:
+        manifest.db.execute("UPDATE entries SET output_sha256 = NULL")
+
+    resumed = _run([a], tmp_path / "out", manifest)[str(a)]
+    assert resumed.ok and not resumed.skipped
+    assert resumed.output_path == output
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == ["a.jpg"]
+
+
+def test_recorded_outputs_are_not_given_to_new_inputs(tmp_path: Path) -> None:
+    (tmp_path / "one").mkdir()
+    (tmp_path / "two").mkdir()
+    first = _image(tmp_path / "one" / "photo.jpg", (255, 0, 0))
+    second = _image(tmp_path / "two" / "photo.jpg", (0, 255, 0))
+    manifest = RunManifest(tmp_path / "manifest.sqlite3")
+    out = tmp_path / "out"
+    recorded = _run([first], out, manifest)[str(first)]
+
+    # The new input comes first, before the skipped one claims its name
+    results = _run([second, first], out, manifest, on_collision="overwrite")
+    assert results[str(first)].skipped
+    assert results[str(second)].output_path == out / "photo-2.jpg"
+    assert FileHasher.sha256(out / "photo.jpg") == recorded.sha256
+
+
+def test_vanished_output_is_reported_without_aborting_the_run(tmp_path: Path) -> None:
+    class VanishingManifest(RunManifest):
+        def complete(
+            self,
+            path: str | Path,
+            input_sha256: str | None,
+            output_sha256: str,
+            had_metadata: bool,
+        ) -> None:
+            if Path(path).name == "a.jpg":
+                (tmp_path / "out" / "a.jpg").unlink()
+            super().complete(path, input_sha256, output_sha256, had_metadata)
+
+    a = _image(tmp_path / "a.jpg", (255, 0, 0))
+    b = _image(tmp_path / "b.jpg", (0, 255, 0))
+    manifest = VanishingManifest(tmp_path / "manifest.sqlite3")
+
+    results = _run([a, b], tmp_path / "out", manifest)
+    error = results[str(a)].error
+    assert error is not None and error.startswith("FileNotFoundError")
+    assert results[str(b)].ok
+    assert manifest.get(a) is None
+    assert manifest.get(b) is not None
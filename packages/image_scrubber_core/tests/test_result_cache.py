@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import hashlib
+from pathlib import Path
+
+from image_scrubber_core.cache.result_cache import ScrubCache
+
+
+def _put(cache: ScrubCache, key: str, data: bytes) -> str:
+    sha = hashlib.sha256(data).hexdigest()
+    cache.put(key, data, False, sha)
+    return sha
+
+
+def _blobs_on_disk(cache: ScrubCache) -> int:
+    return sum(p.stat().st_size for p in (cache.directory / "objects").rglob("*") if p.is_file())
+
+
+def _touch(cache: ScrubCache, key: str, last_access: float) -> None:
+    with cache.db:
+        cache.db.execute("UPDATE entries SET last_access = ? WHERE key = ?", (last_access, key))
+
+
+def test_shared_blobs_are_counted_once(tmp_path: Path) -> None:
+    cache = ScrubCache(tmp_path)
+    sha = _put(cache, "a", b"x" * 100)
+    _put(cache, "b", b"x" * 100)
+    _put(cache, "c", b"y" * 50)
+
+    assert cache.total_bytes() == 150 == _blobs_on_disk(cache)
+    assert cache.get("a") == (cache._blob_path(sha), False, sha)
+
+
+def test_replacing_an_entry_moves_its_bytes(tmp_path: Path) -> None:
+    cache = ScrubCache(tmp_path)
+    old = _put(cache, "a", b"x" * 100)
+    _put(cache, "a", b"y" * 40)
+
+    assert cache.total_bytes() == 40 == _blobs_on_disk(cache)
+    assert not cache._blob_path(old).exists()
+
+
+def test_eviction_keeps_total_in_step_with_disk(tmp_path: Path) -> None:
+    # Only the size limit applies here
+    cache = ScrubCache(tmp_path, max_bytes=250, max_age=1e12)
+    for i in range(4):
+        _put(cache, f"k{i}", bytes([i]) * 100)
+        _touch(cache, f"k{i}", 1000.0 + i)
+        # Every put past the limit drops the least recently used entry
+        assert cache.total_bytes() <= 250
+
+    assert cache.total_bytes() == 200 == _blobs_on_disk(cache)
+    assert cache.get("k0") is None
+    assert cache.get("k1") is None
+    assert cache.get("k2") is not None
+    assert cache.get("k3") is not None
+
+
+def test_expired_entries_are_dropped(tmp_path: Path) -> None:
+    cache = ScrubCache(tmp_path, max_age=60)
+    _put(cache, "old", b"o" * 10)
+    _put(cache, "new", b"n" * 10)
+    _touch(cache, "old", 1000.0)
+    _touch(cache, "new", 1990.0)
+
+    assert cache.evict(now=2000.0) == 1
+    assert cache.get("old") is None
+    assert cache.total_bytes() == 10 == _blobs_on_disk(cache)
+
+
+def test_total_survives_reopening(tmp_path: Path) -> None:
+    _put(ScrubCache(tmp_path), "a", b"x" * 70)
+    assert ScrubCache(tmp_path).total_bytes() == 70
+
+
+def test_missing_blob_is_a_miss_and_leaves_the_total(tmp_path: Path) -> None:
+    cache = ScrubCache(tmp_path)
+    sha = _put(cache, "a", b"x" * 30)
+    cache._blob_path(sha).unlink()
+
+    assert cache.get("a") is None
+    assert cache.total_bytes() == 0
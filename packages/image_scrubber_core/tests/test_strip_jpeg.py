@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import io
+from typing import Callable
+
+import pytest
+from PIL import Image
+
+from image_scrubber_core.metadata.cleaner import MetadataCleaner
+
+
+def _segment(marker: int, payload: bytes) -> bytes:
+    return bytes((0xFF, marker)) + (len(payload) + 2).to_bytes(2, "big") + payload
+
+
+EXIF = _segment(0xE1, b"Exif\x00\x00MM\x00\x2a\x00\x00\x00\x08\x00\x00")
+XMP = _segment(0xE1, b"http://ns.adobe.com/xap/1.0/\x00<x:xmpmeta>GPS</x:xmpmeta>")
+IPTC = _segment(0xED, b"Photoshop 3.0\x008BIM\x04\x04\x00\x00\x00\x00\x00\x05\x1c\x02\x05ab")
+COMMENT = _segment(0xFE, b"taken at home")
+ICC = _segment(0xE2, b"ICC_PROFILE\x00\x01\x01" + b"\x00" * 32)
+
+
+def _plain_jpeg() -> bytes:
+    buf = io.BytesIO()
+    # Noise gives the scan plenty of 0xFF00 stuffing to walk over
+    Image.effect_noise((64, 48), 80).convert("RGB").save(buf, "JPEG", quality=90)
+    return buf.getvalue()
+
+
+def _with_segments(jpeg: bytes, *segments: bytes) -> bytes:
+    # Right after SOI, ahead of the JFIF header Pillow wrote
+    return jpeg[:2] + b"".join(segments) + jpeg[2:]
+
+
+def _scan(jpeg: bytes) -> bytes:
+    """Everything from the first SOS marker to the end."""
+    return jpeg[jpeg.index(b"\xff\xda") :]
+
+
+def test_metadata_segments_are_dropped_and_scan_is_untouched() -> None:
+    plain = _plain_jpeg()
+    dirty = _with_segments(plain, EXIF, XMP, IPTC, COMMENT)
+
+    stripped, had_metadata = MetadataCleaner.strip_jpeg(dirty)
+
+    assert had_metadata
+    for segment in (EXIF, XMP, IPTC, COMMENT):
+        assert segment not in stripped
+    assert _scan(stripped) == _scan(plain)
+    assert stripped == plain
+    assert Image.open(io.BytesIO(stripped)).tobytes() == Image.open(io.BytesIO(plain)).tobytes()
+
+
+def test_clean_jpeg_round_trips_unchanged() -> None:
+    plain = _plain_jpeg()
+    assert MetadataCleaner.strip_jpeg(plain) == (plain, False)
+
+
+def test_icc_profile_and_jfif_header_are_kept() -> None:
+    dirty = _with_segments(_plain_jpeg(), ICC, EXIF)
+
+    stripped, had_metadata = MetadataCleaner.strip_jpeg(dirty)
+
+    assert had_metadata
+    assert ICC in stripped
+    assert b"JFIF\x00" in stripped
+    assert EXIF not in stripped
+
+
+def test_fill_bytes_before_markers_are_skipped() -> None:
+    plain = _plain_jpeg()
+    # Any marker may be preceded by extra 0xFF fill bytes
+    dirty = plain[:2] + b"\xff\xff" + EXIF + b"\xff" + plain[2:]
+
+    stripped, had_metadata = MetadataCleaner.strip_jpeg(dirty)
+
+    assert had_metadata
+    assert stripped == plain
+
+
+def test_trailer_after_eoi_is_discarded() -> None:
+    plain = _plain_jpeg()
+    stripped, _ = MetadataCleaner.strip_jpeg(memoryview(plain + b"MPF preview bytes"))
+    assert stripped == plain
+
+
+@pytest.mark.parametrize(
+    "cut",
+    [
+        pytest.param(lambda jpeg: jpeg[:5], id="segment-header"),
+        pytest.param(lambda jpeg: jpeg[:30], id="segment-body"),
+        pytest.param(lambda jpeg: jpeg[:-2], id="missing-eoi"),
+    ],
+)
+def test_truncated_jpeg_is_rejected(cut: Callable[[bytes], bytes]) -> None:
+    dirty = _with_segments(_plain_jpeg(), EXIF)
+    with pytest.raises(ValueError, match="Corrupt JPEG"):
+        MetadataCleaner.strip_jpeg(cut(dirty))
+
+
+def test_non_jpeg_is_rejected() -> None:
+    with pytest.raises(ValueError, match="Not a JPEG"):
+        MetadataCleaner.strip_jpeg(b"\x89PNG\r\n\x1a\n")